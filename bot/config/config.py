@@ -12,20 +12,39 @@ class Settings(BaseSettings):
     FIX_CERT: bool = False
 
     SESSION_START_DELAY: int = 360
+    TG_CLIENT_RELEASE_AFTER: int = 1800
 
     REF_ID: str = '252453226'
+    GIFTOPIA_BASE_URL: str = "https://giftopia.games"
+    ASSET_CACHE_TTL: int = 3600
     SESSIONS_PER_PROXY: int = 1
     USE_PROXY: bool = True
     DISABLE_PROXY_REPLACE: bool = False
+    PROXY_REBALANCE_INTERVAL: int = 1800
+    PROXY_REBALANCE_BATCH: int = 5
+    PROXY_CHECK_INTERVAL: int = 300
+    PROXY_CHECK_CONCURRENCY: int = 50
 
     DEVICE_PARAMS: bool = False
 
     DEBUG_LOGGING: bool = False
+    LOG_FORMAT: str = "color"
+    EVENT_LOG: bool = False
+    EVENT_LOG_RETENTION: str = "7 days"
+    PROFILER_PORT: int = 0
+    PROFILER_SAMPLE_INTERVAL: float = 0.01
+    PROFILER_SLOW_CALLBACK: float = 0.1
+    WATCHDOG_LAG_THRESHOLD: float = 0.5
+    WATCHDOG_QUEUE_THRESHOLD: int = 50
+    WATCHDOG_REPORT_INTERVAL: int = 60
 
     AUTO_UPDATE: bool = True
     CHECK_UPDATE_INTERVAL: int = 60
     BLACKLISTED_SESSIONS: str = ""
 
+    SUBSCRIBE_CONCURRENCY: int = 10
+    SUBSCRIBE_DC_INTERVAL: float = 2.0
+
     SLEEP_MIN: int = 30
     SLEEP_MAX: int = 120
 
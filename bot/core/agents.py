@@ -1,9 +1,113 @@
-from ua_generator import generate
-from ua_generator.options import Options
-from ua_generator.data.version import VersionRange
+import hashlib
+import json
+import os
+import random
+import re
+from functools import lru_cache
+from typing import Optional
 
+from bot.utils import logger, CONFIG_PATH
+from bot.utils.tg_cache import JsonCacheStore
 
-def generate_random_user_agent(platform: str = 'android', browser: str = 'chrome', 
+POOL_SIZE = 512
+CHROME_VERSION = re.compile(r'Chrome/(\d+)')
+
+
+def _generate(platform: str, browser: str, min_version: int, max_version: int):
+    from ua_generator import generate
+    from ua_generator.options import Options
+    from ua_generator.data.version import VersionRange
+
+    options = Options(version_ranges={browser: VersionRange(min_version, max_version)})
+    return generate(browser=browser, platform=platform, options=options)
+
+
+def _pool_entry(user_agent) -> dict[str, str]:
+    headers = dict(user_agent.headers.get())
+    headers['x-device-model'] = headers['user-agent']
+    return headers
+
+
+@lru_cache(maxsize=4096)
+def _derived_headers(user_agent: str) -> dict[str, str]:
+    version = CHROME_VERSION.search(user_agent)
+    major = version.group(1) if version else '131'
+    mobile = 'Mobile' in user_agent or 'Android' in user_agent
+    platform = 'Android' if 'Android' in user_agent else 'iOS' if 'iPhone' in user_agent else \
+        'macOS' if 'Mac OS X' in user_agent else 'Windows' if 'Windows' in user_agent else 'Linux'
+    return {
+        'user-agent': user_agent,
+        'sec-ch-ua': f'"Not A(Brand";v="99", "Chromium";v="{major}", "Google Chrome";v="{major}"',
+        'sec-ch-ua-mobile': '?1' if mobile else '?0',
+        'sec-ch-ua-platform': f'"{platform}"',
+        'x-device-model': user_agent,
+    }
+
+
+class UserAgentPool(JsonCacheStore):
+    """User agents generated once and kept on disk, with the client-hint headers of each.
+
+    Newer browser versions are drawn more often, so the pool follows a weighted version
+    distribution and an entry is picked with a single index lookup.
+    """
+
+    def __init__(self, cache_path: str, platform: str = 'android', browser: str = 'chrome',
+                 min_version: int = 110, max_version: int = 129, size: int = POOL_SIZE):
+        super().__init__(cache_path)
+        self.params = {'platform': platform, 'browser': browser, 'min_version': min_version,
+                       'max_version': max_version, 'size': size}
+        self._entries: Optional[list[dict[str, str]]] = None
+        self._by_user_agent: dict[str, dict[str, str]] = {}
+
+    @property
+    def entries(self) -> list[dict[str, str]]:
+        if self._entries is None:
+            self._load()
+        return self._entries
+
+    def _load(self) -> None:
+        if self.data.get('params') != self.params or not self.data.get('entries'):
+            self._data = {'params': self.params, 'entries': self._build()}
+            logger.info(f"Generated a pool of {len(self._data['entries'])} user agents")
+            try:
+                self._write(json.dumps(self._data, separators=(',', ':')))
+            except OSError as e:
+                logger.warning(f"Failed to save the user agent pool to `{self.cache_path}`: {e}")
+        self._entries = self._data['entries']
+        self._by_user_agent = {entry['user-agent']: entry for entry in self._entries}
+
+    def _build(self) -> list[dict[str, str]]:
+        params = self.params
+        versions = list(range(params['min_version'], params['max_version'] + 1))
+        # Weight grows linearly with the version, so the newest one is the most common
+        chosen = random.choices(versions, weights=range(1, len(versions) + 1), k=params['size'])
+        return [_pool_entry(_generate(params['platform'], params['browser'], version, version))
+                for version in chosen]
+
+    def for_session(self, session_name: str) -> dict[str, str]:
+        """The same entry for a session name on every run, as long as the pool is unchanged."""
+        digest = hashlib.blake2b(session_name.encode(), digest_size=8).digest()
+        entries = self.entries
+        return entries[int.from_bytes(digest, 'big') % len(entries)]
+
+    def headers_for(self, user_agent: str) -> dict[str, str]:
+        """User-agent, client-hint and device headers consistent with `user_agent`."""
+        if self._entries is None:
+            self._load()
+        return self._by_user_agent.get(user_agent) or _derived_headers(user_agent)
+
+
+user_agent_pool = UserAgentPool(os.path.join(os.path.dirname(CONFIG_PATH), 'user_agents.json'))
+
+
+def session_user_agent(session_name: str) -> str:
+    return user_agent_pool.for_session(session_name)['user-agent']
+
+
+def generate_random_user_agent(platform: str = 'android', browser: str = 'chrome',
                                 min_version: int = 110, max_version: int = 129) -> str:
-    options = Options(version_ranges={'chrome': VersionRange(min_version, max_version)})
-    return generate(browser=browser, platform=platform, options=options).text
+    params = user_agent_pool.params
+    if (platform, browser, min_version, max_version) == \
+            (params['platform'], params['browser'], params['min_version'], params['max_version']):
+        return random.choice(user_agent_pool.entries)['user-agent']
+    return _generate(platform, browser, min_version, max_version).text
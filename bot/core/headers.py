@@ -1,4 +1,8 @@
-from typing import Dict
+from typing import Dict, Mapping
+
+from multidict import CIMultiDict, CIMultiDictProxy
+
+GIFTOPIA_ORIGIN = 'https://giftopia.games'
 
 HEADERS = {
     'accept': 'application/json',
@@ -6,10 +10,10 @@ HEADERS = {
     'cache-control': 'no-cache',
     'content-type': 'application/json',
     'dnt': '1',
-    'origin': 'https://bitappprod.com',
+    'origin': GIFTOPIA_ORIGIN,
     'pragma': 'no-cache',
     'priority': 'u=1, i',
-    'referer': 'https://bitappprod.com/',
+    'referer': f'{GIFTOPIA_ORIGIN}/',
     'sec-ch-ua': '"Chromium";v="131", "Not_A Brand";v="24"',
     'sec-ch-ua-mobile': '?0',
     'sec-ch-ua-platform': '"macOS"',
@@ -21,6 +25,15 @@ HEADERS = {
     'x-device-platform': 'android'
 }
 
+COOKIES = {'i18next': 'ru'}
+
+
+def session_headers(user_agent_headers: Mapping[str, str]) -> CIMultiDictProxy:
+    """Read-only HEADERS with one session's user-agent and client hints, built once per session."""
+    headers = CIMultiDict(HEADERS)
+    headers.update(user_agent_headers)
+    return CIMultiDictProxy(headers)
+
 
 def get_auth_headers(token: str) -> Dict[str, str]:
     auth_headers = HEADERS.copy()
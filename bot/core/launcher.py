@@ -1,35 +1,31 @@
-import glob
 import asyncio
 import argparse
 import os
 import subprocess
 import signal
+from collections import Counter
 from copy import deepcopy
 from random import uniform
 from colorama import init, Fore, Style
-import shutil
 from typing import Optional
+from better_proxy import Proxy
 
 from bot.utils.universal_telegram_client import UniversalTelegramClient
-from bot.utils.web import run_web_and_tunnel, stop_web_and_tunnel
 from bot.config import settings
-from bot.core.agents import generate_random_user_agent
+from bot.core.agents import session_user_agent
 from bot.utils import logger, config_utils, proxy_utils, CONFIG_PATH, SESSIONS_PATH, PROXIES_PATH
-from bot.core.tapper import run_tapper
-from bot.core.registrator import register_sessions
+from bot.core.quarantine import quarantine_service
 from bot.utils.updater import UpdateManager
+from bot.utils.session_preflight import preflight_sessions, session_index
+from bot.utils.session_catalog import get_session_catalog
+from bot.utils.tg_cache import flush_all
+from bot.utils.tg_backends import session_errors
+from bot.utils.profiler import install_signal_toggle, run_control_server
+from bot.utils.watchdog import watchdog
+from bot.devtools import startup_profile
 from bot.exceptions import InvalidSession
 
-from telethon.errors import (
-    AuthKeyUnregisteredError, AuthKeyDuplicatedError, AuthKeyError,
-    SessionPasswordNeededError
-)
-
-from pyrogram.errors import (
-    AuthKeyUnregistered as PyrogramAuthKeyUnregisteredError,
-    SessionPasswordNeeded as PyrogramSessionPasswordNeededError,
-    SessionRevoked as PyrogramSessionRevoked
-)
+# Telethon, Pyrogram, Flask and the Cloudflare scraper are imported by the action that needs them
 
 init()
 shutdown_event = asyncio.Event()
@@ -78,6 +74,11 @@ async def process() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("-a", "--action", type=int, help="Action to perform")
     parser.add_argument("--update-restart", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--preflight", action="store_true", help="Validate session files and exit")
+    parser.add_argument("--preflight-live", action="store_true", help="Also call get_me for every valid session")
+    parser.add_argument("--preflight-workers", type=int, default=16, help="Number of sessions validated at once")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print an import-time and cold-start breakdown once the action has started")
     args = parser.parse_args()
 
     if not settings.USE_PROXY:
@@ -85,23 +86,38 @@ async def process() -> None:
     else:
         logger.info(f"Detected {len(get_sessions(SESSIONS_PATH))} sessions | "
                     f"{len(proxy_utils.get_proxies(PROXIES_PATH))} proxies")
+    startup_profile.mark('sessions detected')
+
+    if args.preflight or args.preflight_live:
+        await run_preflight(live=args.preflight_live, workers=max(args.preflight_workers, 1))
+        startup_profile.mark('preflight')
+        startup_profile.report()
+        return
 
     action = args.action
     if not action and not args.update_restart:
         action = prompt_user_action()
+        startup_profile.mark('action prompt')
 
     if action == 1:
         if not API_ID or not API_HASH:
             raise ValueError("API_ID and API_HASH not found in the .env file.")
         await run_tasks()
     elif action == 2:
+        from bot.core.registrator import register_sessions
+        startup_profile.mark('registrator imported')
+        startup_profile.report()
         await register_sessions()
     elif action == 3:
+        startup_profile.report()
         session_name = input("Enter the session name for QR code authentication: ")
         print("Initializing QR code authentication...")
         subprocess.run(["python", "-m", "bot.utils.loginQR", "-s", session_name])
         print("QR code authentication was successful!")
     elif action == 4:
+        from bot.utils.web import run_web_and_tunnel, stop_web_and_tunnel
+        startup_profile.mark('web interface imported')
+        startup_profile.report()
         logger.info("Starting web interface for uploading sessions...")
         signal.signal(signal.SIGINT, signal_handler)
         try:
@@ -112,106 +128,83 @@ async def process() -> None:
             await stop_web_and_tunnel()
             print("Program terminated.")
 
-async def move_invalid_session_to_error_folder(session_name: str) -> None:
-    error_dir = os.path.join(SESSIONS_PATH, "error")
-    os.makedirs(error_dir, exist_ok=True)
-    
-    session_patterns = [
-        f"{SESSIONS_PATH}/{session_name}.session",
-        f"{SESSIONS_PATH}/telethon/{session_name}.session",
-        f"{SESSIONS_PATH}/pyrogram/{session_name}.session"
-    ]
-    
-    found = False
-    for pattern in session_patterns:
-        matching_files = glob.glob(pattern)
-        for session_file in matching_files:
-            found = True
-            if os.path.exists(session_file):
-                relative_path = os.path.relpath(os.path.dirname(session_file), SESSIONS_PATH)
-                if relative_path == ".":
-                    target_dir = error_dir
-                else:
-                    target_dir = os.path.join(error_dir, relative_path)
-                    os.makedirs(target_dir, exist_ok=True)
-                
-                target_path = os.path.join(target_dir, os.path.basename(session_file))
-                try:
-                    shutil.move(session_file, target_path)
-                    logger.warning(f"Session {session_name} moved to {target_path} due to invalidity")
-                except Exception as e:
-                    logger.error(f"Error moving session {session_name}: {e}")
-    
-    if not found:
-        logger.error(f"Session {session_name} not found when attempting to move to error folder")
+async def move_invalid_session_to_error_folder(session_name: str, reason: str = "invalid session") -> None:
+    await quarantine_service.quarantine(session_name, reason)
 
 def get_sessions(sessions_folder: str) -> list[str]:
-    session_names = glob.glob(f"{sessions_folder}/*.session")
-    session_names += glob.glob(f"{sessions_folder}/telethon/*.session")
-    session_names += glob.glob(f"{sessions_folder}/pyrogram/*.session")
-    return [file.replace('.session', '') for file in sorted(session_names)]
+    return get_session_catalog(sessions_folder).paths()
+
+def get_client_params(session: str, api_config: dict) -> dict:
+    api = None
+    if api_config.get('api_id') in [4, 6, 2040, 10840, 21724]:
+        api = config_utils.get_api(api_config)
+
+    if api:
+        return {
+            "session": session,
+            "api": api
+        }
+
+    client_params = {
+        "api_id": api_config.get("api_id", API_ID),
+        "api_hash": api_config.get("api_hash", API_HASH),
+        "session": session,
+        "lang_code": api_config.get("lang_code", "en"),
+        "system_lang_code": api_config.get("system_lang_code", "en-US")
+    }
+
+    for key in ("device_model", "system_version", "app_version"):
+        if api_config.get(key):
+            client_params[key] = api_config[key]
+    return client_params
 
 async def get_tg_clients() -> list[UniversalTelegramClient]:
-    session_paths = get_sessions(SESSIONS_PATH)
+    session_entries = get_session_catalog(SESSIONS_PATH).entries()
 
-    if not session_paths:
+    if not session_entries:
         raise FileNotFoundError("Session files not found")
     tg_clients = []
-    for session in session_paths:
-        session_name = os.path.basename(session)
+    accounts_config = config_utils.read_config_file(CONFIG_PATH)
+    proxy_registry = proxy_utils.get_proxy_registry(PROXIES_PATH)
+    for entry in session_entries:
+        session = entry.path
+        session_name = entry.name
 
         if session_name in settings.blacklisted_sessions:
             logger.warning(f"{session_name} | Session is blacklisted | Skipping")
             continue
 
-        accounts_config = config_utils.read_config_file(CONFIG_PATH)
+        if session_index.is_invalid(session):
+            logger.warning(f"{session_name} | Session failed preflight validation | Skipping")
+            continue
+
         session_config: dict = deepcopy(accounts_config.get(session_name, {}))
         if 'api' not in session_config:
             session_config['api'] = {}
         api_config = session_config.get('api', {})
-        api = None
-        if api_config.get('api_id') in [4, 6, 2040, 10840, 21724]:
-            api = config_utils.get_api(api_config)
-
-        if api:
-            client_params = {
-                "session": session,
-                "api": api
-            }
-        else:
-            client_params = {
-                "api_id": api_config.get("api_id", API_ID),
-                "api_hash": api_config.get("api_hash", API_HASH),
-                "session": session,
-                "lang_code": api_config.get("lang_code", "en"),
-                "system_lang_code": api_config.get("system_lang_code", "en-US")
-            }
-
-            for key in ("device_model", "system_version", "app_version"):
-                if api_config.get(key):
-                    client_params[key] = api_config[key]
-
-        session_config['user_agent'] = session_config.get('user_agent', generate_random_user_agent())
+        client_params = get_client_params(session, api_config)
+        # A session file that is back in the sessions folder was restored from quarantine
+        session_config.pop('active', None)
+
+        session_config['user_agent'] = session_config.get('user_agent') or session_user_agent(session_name)
         api_config.update(api_id=client_params.get('api_id') or client_params.get('api').api_id,
                           api_hash=client_params.get('api_hash') or client_params.get('api').api_hash)
 
         session_proxy = session_config.get('proxy')
         if not session_proxy and 'proxy' in session_config.keys():
             try:
-                tg_clients.append(UniversalTelegramClient(**client_params))
+                tg_clients.append(UniversalTelegramClient(backend_name=entry.backend, **client_params))
                 if accounts_config.get(session_name) != session_config:
                     await config_utils.update_session_config_in_file(session_name, session_config, CONFIG_PATH)
-            except (AuthKeyUnregisteredError, AuthKeyDuplicatedError, AuthKeyError,
-                   SessionPasswordNeededError, PyrogramAuthKeyUnregisteredError,
-                    PyrogramSessionPasswordNeededError,
-                   PyrogramSessionRevoked, InvalidSession) as e:
+                    accounts_config[session_name] = session_config
+            except (*session_errors(), InvalidSession) as e:
                 logger.error(f"{session_name} | Session initialization error: {e}")
-                await move_invalid_session_to_error_folder(session_name)
+                await move_invalid_session_to_error_folder(session_name, str(e))
             continue
 
         else:
             if settings.DISABLE_PROXY_REPLACE:
-                proxy = session_proxy or next(iter(proxy_utils.get_unused_proxies(accounts_config, PROXIES_PATH)), None)
+                proxy = session_proxy or proxy_utils.get_best_unused_proxy(accounts_config, PROXIES_PATH)
             else:
                 proxy = await proxy_utils.get_working_proxy(accounts_config, session_proxy) \
                     if session_proxy or settings.USE_PROXY else None
@@ -221,19 +214,42 @@ async def get_tg_clients() -> list[UniversalTelegramClient]:
                 continue
             else:
                 try:
-                    tg_clients.append(UniversalTelegramClient(**client_params))
+                    tg_clients.append(UniversalTelegramClient(backend_name=entry.backend, **client_params))
                     session_config['proxy'] = proxy
                     if accounts_config.get(session_name) != session_config:
                         await config_utils.update_session_config_in_file(session_name, session_config, CONFIG_PATH)
-                except (AuthKeyUnregisteredError, AuthKeyDuplicatedError, AuthKeyError,
-                      SessionPasswordNeededError, PyrogramAuthKeyUnregisteredError,
-                       PyrogramSessionPasswordNeededError,
-                      PyrogramSessionRevoked, InvalidSession) as e:
+                        accounts_config[session_name] = session_config
+                        proxy_registry.assign(session_name, proxy)
+                except (*session_errors(), InvalidSession) as e:
                     logger.error(f"{session_name} | Session initialization error: {e}")
-                    await move_invalid_session_to_error_folder(session_name)
+                    await move_invalid_session_to_error_folder(session_name, str(e))
 
     return tg_clients
 
+async def run_preflight(live: bool, workers: int) -> None:
+    session_paths = get_sessions(SESSIONS_PATH)
+    if not session_paths:
+        raise FileNotFoundError("Session files not found")
+
+    client_factory = None
+    if live:
+        accounts_config = config_utils.read_config_file(CONFIG_PATH)
+        sessions_by_name = {os.path.basename(session): session for session in session_paths}
+
+        def client_factory(session_name: str) -> UniversalTelegramClient:
+            session_config = accounts_config.get(session_name, {})
+            tg_client = UniversalTelegramClient(
+                **get_client_params(sessions_by_name[session_name], session_config.get('api', {})))
+            if session_config.get('proxy'):
+                tg_client.set_proxy(Proxy.from_str(session_config['proxy']))
+            return tg_client
+
+    results = await preflight_sessions(session_paths, workers, client_factory)
+    invalid = {name: entry['error'] for name, entry in results.items() if entry['error']}
+    for session_name, error in invalid.items():
+        logger.warning(f"{session_name} | Preflight failed: {error}")
+    logger.info(f"Preflight | {len(results) - len(invalid)}/{len(results)} sessions are valid")
+
 async def init_config_file() -> None:
     session_paths = get_sessions(SESSIONS_PATH)
 
@@ -245,23 +261,42 @@ async def init_config_file() -> None:
         if parsed_json:
             accounts_config = config_utils.read_config_file(CONFIG_PATH)
             session_config: dict = deepcopy(accounts_config.get(session_name, {}))
-            session_config['user_agent'] = session_config.get('user_agent', generate_random_user_agent())
+            session_config['user_agent'] = session_config.get('user_agent') or session_user_agent(session_name)
             session_config['api'] = parsed_json
             if accounts_config.get(session_name) != session_config:
                 await config_utils.update_session_config_in_file(session_name, session_config, CONFIG_PATH)
 
 async def run_tasks() -> None:
+    # Imported up front so the Cloudflare scraper counts towards startup, not the first session
+    from bot.core import tapper  # noqa: F401
+    startup_profile.mark('tapper imported')
     await config_utils.restructure_config(CONFIG_PATH)
     await init_config_file()
-    
+    startup_profile.mark('accounts config prepared')
+
     base_tasks = []
     
     if settings.AUTO_UPDATE:
         update_manager = UpdateManager()
         base_tasks.append(asyncio.create_task(update_manager.run()))
+
+    if settings.USE_PROXY:
+        base_tasks.append(asyncio.create_task(run_proxy_prober()))
+
+    if settings.USE_PROXY and not settings.DISABLE_PROXY_REPLACE and settings.PROXY_REBALANCE_INTERVAL > 0:
+        base_tasks.append(asyncio.create_task(run_proxy_rebalancer()))
+
+    if settings.WATCHDOG_LAG_THRESHOLD > 0:
+        base_tasks.append(asyncio.create_task(watchdog.run()))
+
+    install_signal_toggle()
+    if settings.PROFILER_PORT:
+        base_tasks.append(asyncio.create_task(run_control_server(settings.PROFILER_PORT)))
     
     tg_clients = await get_tg_clients()
     client_tasks = [asyncio.create_task(handle_tapper_session(tg_client=tg_client)) for tg_client in tg_clients]
+    startup_profile.mark('clients prepared')
+    startup_profile.report()
     
     try:
         if client_tasks:
@@ -279,23 +314,76 @@ async def run_tasks() -> None:
                 task.cancel()
         await asyncio.gather(*client_tasks + base_tasks, return_exceptions=True)
         raise
+    finally:
+        await flush_all()
         
+async def run_proxy_prober() -> None:
+    while True:
+        try:
+            accounts_config = config_utils.read_config_file(CONFIG_PATH)
+            proxies = list({v['proxy'] for v in accounts_config.values() if v.get('proxy') and v.get('active', True)})
+            if proxies:
+                alive = await proxy_utils.probe_proxies(proxies, settings.PROXY_CHECK_CONCURRENCY)
+                logger.info(f"Proxy prober | {alive}/{len(proxies)} proxies in use are alive")
+            if not settings.DISABLE_PROXY_REPLACE and settings.PROXY_REBALANCE_INTERVAL > 0:
+                # The rebalancer only moves sessions to free proxies with a recent measurement
+                candidates = proxy_utils.sample_free_proxies(accounts_config, PROXIES_PATH,
+                                                             settings.PROXY_CHECK_CONCURRENCY)
+                if candidates:
+                    await proxy_utils.probe_proxies(candidates, settings.PROXY_CHECK_CONCURRENCY)
+        except Exception as e:
+            logger.error(f"Error during proxy probing: {e}")
+        await asyncio.sleep(settings.PROXY_CHECK_INTERVAL)
+
+async def run_proxy_rebalancer() -> None:
+    while True:
+        await asyncio.sleep(settings.PROXY_REBALANCE_INTERVAL)
+        try:
+            accounts_config = config_utils.read_config_file(CONFIG_PATH)
+            moves = proxy_utils.plan_proxy_rebalance(accounts_config, PROXIES_PATH, settings.PROXY_REBALANCE_BATCH)
+            if not moves:
+                continue
+            planned = {session_name: (accounts_config[session_name]['proxy'], proxy)
+                       for session_name, proxy in moves.items()}
+            applied = []
+
+            def apply_moves(config: dict) -> bool:
+                # Skip sessions whose proxy changed since planning and targets that filled up meanwhile
+                usage = Counter(cfg.get('proxy') for cfg in config.values() if cfg.get('active', True))
+                for session_name, (old_proxy, new_proxy) in planned.items():
+                    session_config = config.get(session_name)
+                    if (not session_config or session_config.get('proxy') != old_proxy
+                            or not session_config.get('active', True)
+                            or usage[new_proxy] >= settings.SESSIONS_PER_PROXY):
+                        continue
+                    session_config['proxy'] = new_proxy
+                    usage[old_proxy] -= 1
+                    usage[new_proxy] += 1
+                    applied.append(session_name)
+                return bool(applied)
+
+            await config_utils.update_config_file(CONFIG_PATH, apply_moves)
+            if applied:
+                logger.info(f"Proxy rebalance | Reassigned {len(applied)} session(s) to faster proxies")
+        except Exception as e:
+            logger.error(f"Error during proxy rebalance: {e}")
+
 async def handle_tapper_session(tg_client: UniversalTelegramClient, stats_bot: Optional[object] = None):
+    from bot.core.tapper import run_tapper
+
     session_name = tg_client.session_name
     try:
         logger.info(f"{session_name} | Starting session")
         await run_tapper(tg_client=tg_client)
     except InvalidSession as e:
         logger.error(f"Invalid session: {session_name}: {e}")
-        await move_invalid_session_to_error_folder(session_name)
-    except (AuthKeyUnregisteredError, AuthKeyDuplicatedError, AuthKeyError, 
-            SessionPasswordNeededError) as e:
+        await move_invalid_session_to_error_folder(session_name, str(e))
+    except session_errors('telethon') as e:
         logger.error(f"Authentication error for Telethon session {session_name}: {e}")
-        await move_invalid_session_to_error_folder(session_name)
-    except (PyrogramAuthKeyUnregisteredError,
-            PyrogramSessionPasswordNeededError, PyrogramSessionRevoked) as e:
+        await move_invalid_session_to_error_folder(session_name, str(e))
+    except session_errors('pyrogram') as e:
         logger.error(f"Authentication error for Pyrogram session {session_name}: {e}")
-        await move_invalid_session_to_error_folder(session_name)
+        await move_invalid_session_to_error_folder(session_name, str(e))
     except Exception as e:
         logger.error(f"Unexpected error in session {session_name}: {e}")
     finally:
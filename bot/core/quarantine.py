@@ -0,0 +1,114 @@
+import asyncio
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+from typing import Optional
+
+from bot.utils import logger, config_utils, proxy_utils, CONFIG_PATH, SESSIONS_PATH, PROXIES_PATH
+from bot.utils.session_catalog import get_session_catalog
+from bot.utils.tg_cache import JsonCacheStore
+from bot.utils.watchdog import watchdog
+
+
+class QuarantineService:
+    """Moves invalid sessions into the error folder without blocking the event loop.
+
+    Requests arriving within `batch_delay` of each other are handled as one batch: the
+    files are moved on a dedicated worker thread, then the quarantine index and the
+    accounts config are each written once for the whole batch.
+    """
+
+    batch_delay = 0.5
+
+    def __init__(self, sessions_path: str, config_path: str, proxy_path: str):
+        self.sessions_path = sessions_path
+        self.config_path = config_path
+        self.proxy_path = proxy_path
+        self.index = JsonCacheStore(os.path.join(os.path.dirname(config_path), 'quarantine.json'))
+        self._pending: dict[str, tuple[str, list[asyncio.Future]]] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def quarantine(self, session_name: str, reason: str) -> bool:
+        """Queue a session for quarantine; returns True once its files have been moved."""
+        future = asyncio.get_running_loop().create_future()
+        _, waiters = self._pending.setdefault(session_name, (reason, []))
+        waiters.append(future)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush())
+        return await asyncio.shield(future)
+
+    async def _flush(self) -> None:
+        await asyncio.sleep(self.batch_delay)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='quarantine')
+            watchdog.watch_executor('quarantine', self._executor)
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            batch, self._pending = self._pending, {}
+            try:
+                moved = await loop.run_in_executor(self._executor, self._move_batch, list(batch))
+                await self._record(batch, moved)
+            except Exception as e:
+                logger.error(f"Error while quarantining {len(batch)} session(s): {e}")
+                moved = {}
+            for session_name, (_, waiters) in batch.items():
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(bool(moved.get(session_name)))
+
+    def _move_batch(self, session_names: list[str]) -> dict[str, list[str]]:
+        error_dir = os.path.join(self.sessions_path, "error")
+        os.makedirs(error_dir, exist_ok=True)
+        catalog = get_session_catalog(self.sessions_path)
+
+        moved = {}
+        for session_name in session_names:
+            targets = []
+            for entry in catalog.find(session_name):
+                session_file = entry.file_path
+                if not os.path.exists(session_file):
+                    continue
+                relative_path = os.path.relpath(os.path.dirname(session_file), self.sessions_path)
+                target_dir = error_dir if relative_path == "." else os.path.join(error_dir, relative_path)
+                os.makedirs(target_dir, exist_ok=True)
+
+                target_path = os.path.join(target_dir, os.path.basename(session_file))
+                try:
+                    shutil.move(session_file, target_path)
+                    targets.append(target_path)
+                    logger.warning(f"Session {session_name} moved to {target_path} due to invalidity")
+                except Exception as e:
+                    logger.error(f"Error moving session {session_name}: {e}")
+
+            if targets:
+                moved[session_name] = targets
+            else:
+                logger.error(f"Session {session_name} not found when attempting to move to error folder")
+        return moved
+
+    async def _record(self, batch: dict[str, tuple[str, list]], moved: dict[str, list[str]]) -> None:
+        if not moved:
+            return
+        now = time()
+        for session_name, targets in moved.items():
+            self.index.data[session_name] = {'reason': batch[session_name][0], 'quarantined_at': now, 'files': targets}
+        await self.index.save(*moved)
+
+        def deactivate(accounts_config: dict) -> bool:
+            changed = False
+            for session_name in moved:
+                session_config = accounts_config.get(session_name)
+                if session_config is not None and session_config.get('active', True):
+                    session_config['active'] = False
+                    changed = True
+            return changed
+
+        await config_utils.update_config_file(self.config_path, deactivate)
+        proxy_registry = proxy_utils.get_proxy_registry(self.proxy_path)
+        for session_name in moved:
+            proxy_registry.assign(session_name, None)
+
+
+quarantine_service = QuarantineService(SESSIONS_PATH, CONFIG_PATH, PROXIES_PATH)
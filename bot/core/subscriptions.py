@@ -0,0 +1,100 @@
+import asyncio
+from collections import defaultdict
+from math import inf
+from time import monotonic
+from typing import Awaitable, Callable, Optional
+
+from bot.config import settings
+from bot.utils import log_error
+from bot.utils.universal_telegram_client import JoinResult, UniversalTelegramClient
+
+CompletionCallback = Callable[[str], Awaitable[None]]
+
+
+class SubscriptionExecutor:
+    """Runs join-and-mute work for all sessions under one concurrency cap and per-DC pacing.
+
+    A channel found by one session is announced to every registered session, so a new
+    subscription mission is rolled out across the farm without waiting for each session
+    to wake up. Sessions learn about announced work through their completion callback.
+    A session that has already subscribed to a link is not queued for it again.
+    """
+
+    def __init__(self):
+        self._clients: dict[str, tuple[UniversalTelegramClient, Optional[CompletionCallback]]] = {}
+        self._jobs: dict[tuple[str, str], asyncio.Task] = {}
+        self._finished: set[tuple[str, str]] = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._dc_locks: defaultdict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._dc_last_start: dict[int, float] = {}
+
+    def register(self, tg_client: UniversalTelegramClient, on_complete: Optional[CompletionCallback] = None) -> None:
+        self._clients[tg_client.session_name] = (tg_client, on_complete)
+
+    def unregister(self, tg_client: UniversalTelegramClient) -> None:
+        """Stops announcements to a session that has ended; its queued announced jobs are dropped."""
+        registered = self._clients.get(tg_client.session_name)
+        if registered and registered[0] is tg_client:
+            del self._clients[tg_client.session_name]
+
+    def subscribe(self, tg_client: UniversalTelegramClient, link: str) -> asyncio.Task:
+        return self._submit(tg_client, link, announced=False)
+
+    def announce(self, link: str) -> int:
+        queued = 0
+        for tg_client, _ in self._clients.values():
+            key = (tg_client.session_name, link)
+            if key in self._finished:
+                continue
+            job = self._jobs.get(key)
+            if job is None or job.done():
+                self._submit(tg_client, link, announced=True)
+                queued += 1
+        return queued
+
+    def _submit(self, tg_client: UniversalTelegramClient, link: str, announced: bool) -> asyncio.Task:
+        key = (tg_client.session_name, link)
+        job = self._jobs.get(key)
+        if job is None or job.done():
+            job = asyncio.create_task(self._execute(tg_client, link, announced))
+            self._jobs[key] = job
+        return job
+
+    async def _execute(self, tg_client: UniversalTelegramClient, link: str, announced: bool) -> bool:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(max(settings.SUBSCRIBE_CONCURRENCY, 1))
+        try:
+            async with self._semaphore:
+                # The session may have ended while the job waited for a slot
+                if announced and not self._is_registered(tg_client):
+                    return False
+                await self._pace(tg_client.dc_id)
+                result = await tg_client.join_and_mute_tg_channel(link)
+            if not isinstance(result, JoinResult) or not result.succeeded:
+                return False
+        except Exception as e:
+            log_error(f"{tg_client.session_name} | Error while subscribing to {link}: {e}")
+            return False
+        self._finished.add((tg_client.session_name, link))
+
+        _, on_complete = self._clients.get(tg_client.session_name, (None, None))
+        if announced and on_complete:
+            try:
+                await on_complete(link)
+            except Exception as e:
+                log_error(f"{tg_client.session_name} | Error in subscription callback for {link}: {e}")
+        return True
+
+    def _is_registered(self, tg_client: UniversalTelegramClient) -> bool:
+        registered = self._clients.get(tg_client.session_name)
+        return registered is not None and registered[0] is tg_client
+
+    async def _pace(self, dc_id: int) -> None:
+        async with self._dc_locks[dc_id]:
+            delay = self._dc_last_start.get(dc_id, -inf) + settings.SUBSCRIBE_DC_INTERVAL - monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._dc_last_start[dc_id] = monotonic()
+
+
+subscription_executor = SubscriptionExecutor()
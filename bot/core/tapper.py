@@ -1,12 +1,12 @@
 import aiohttp
 import asyncio
-from typing import Dict, Optional, Any, Tuple, List
+from typing import Callable, Dict, Optional, Any, Tuple, List, Union
 from urllib.parse import urlencode, unquote
 from aiocfscrape import CloudflareScraper
 from aiohttp_proxy import ProxyConnector
 from better_proxy import Proxy
 from random import uniform, randint
-from time import time
+from time import time, monotonic
 from datetime import datetime, timezone
 import json
 import os
@@ -14,17 +14,21 @@ import traceback
 import random
 
 from bot.utils.universal_telegram_client import UniversalTelegramClient
-from bot.utils.proxy_utils import check_proxy, get_working_proxy
+from bot.utils.proxy_utils import is_proxy_alive, get_working_proxy, get_proxy_registry
 from bot.utils.first_run import check_is_first_run, append_recurring_session
 from bot.config import settings
-from bot.utils import logger, config_utils, CONFIG_PATH
+from bot.utils import logger, config_utils, CONFIG_PATH, PROXIES_PATH
+from bot.utils.event_log import emit_event
+from bot.utils.asset_cache import asset_cache
+from bot.utils.profiler import profiler
 from bot.exceptions import InvalidSession
-from bot.core.headers import HEADERS
-from bot.core.agents import generate_random_user_agent
+from bot.core.headers import COOKIES, session_headers
+from bot.core.agents import session_user_agent, user_agent_pool
+from bot.core.subscriptions import subscription_executor
 
 
 class TapperBot:
-    BASE_URL = "https://giftopia.games"
+    BASE_URL = settings.GIFTOPIA_BASE_URL.rstrip("/")
     EMOJI = {
         'debug': '🔍',
         'success': '✅',
@@ -41,8 +45,6 @@ class TapperBot:
 
     def __init__(self, tg_client: UniversalTelegramClient):
         self.tg_client = tg_client
-        if hasattr(self.tg_client, 'client'):
-            self.tg_client.client.no_updates = True
         self.session_name = tg_client.session_name
         self._http_client: Optional[CloudflareScraper] = None
         self._current_proxy: Optional[str] = None
@@ -52,20 +54,28 @@ class TapperBot:
         self._current_ref_id: Optional[str] = None
         self._user_agent: Optional[str] = None
         self._auth_token: Optional[str] = None
+        self._cycle = 0
+        self._retiring_http_clients: set[asyncio.Task] = set()
+        self._mission_seq: Optional[int] = None
         session_config = config_utils.get_session_config(self.session_name, CONFIG_PATH)
         if not all(key in session_config for key in ('api', 'user_agent')):
             logger.critical(f"CHECK accounts_config.json as it might be corrupted")
             exit(-1)
         self._user_agent = session_config.get('user_agent')
+        self._headers = session_headers(
+            user_agent_pool.headers_for(self._user_agent or session_user_agent(self.session_name)))
         self.proxy = session_config.get('proxy')
         if self.proxy:
             proxy = Proxy.from_str(self.proxy)
             self.tg_client.set_proxy(proxy)
             self._current_proxy = self.proxy
+        subscription_executor.register(self.tg_client, self._on_subscription_completed)
 
-    def _log(self, level: str, message: str, emoji_key: Optional[str] = None) -> None:
+    def _log(self, level: str, message: Union[str, Callable[[], str]], emoji_key: Optional[str] = None) -> None:
         if level == 'debug' and not settings.DEBUG_LOGGING:
             return
+        if callable(message):
+            message = message()
         emoji = self.EMOJI.get(emoji_key, '') if emoji_key else ''
         formatted_message = f"{emoji} {message}" if emoji else message
         session_prefix = f"{self.session_name} | "
@@ -83,6 +93,14 @@ class TapperBot:
         else:
             logger.info(full_message)
 
+    def _event(self, stage: str, status, started: Optional[float] = None,
+               endpoint: Optional[str] = None, **extra) -> None:
+        emit_event(self.session_name, stage, status, latency=monotonic() - started if started is not None else None,
+                   endpoint=endpoint, seq=self._mission_seq, cycle=self._cycle, **extra)
+
+    async def _sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
     def get_ref_id(self) -> str:
         if self._current_ref_id is None:
             session_hash = sum(ord(c) for c in self.session_name)
@@ -94,6 +112,8 @@ class TapperBot:
         return self._current_ref_id
 
     async def get_tg_web_data(self, app_name: str, path: str) -> str:
+        started = monotonic()
+        status = 'error'
         try:
             webview_url = await self.tg_client.get_app_webview_url(
                 app_name,
@@ -106,6 +126,7 @@ class TapperBot:
                 string=webview_url.split('tgWebAppData=')[1].split('&tgWebAppVersion')[0]
             )
             self._init_data = tg_web_data
+            status = 'ok'
             self._log('debug', f'Получены TG Web Data для {app_name}: {tg_web_data}', 'info')
             return tg_web_data
         except InvalidSession as e:
@@ -113,29 +134,61 @@ class TapperBot:
             raise
         except aiohttp.ClientError as e:
             self._log('error', f"Сетевая ошибка при получении TG Web Data в TapperBot: {str(e)}", 'error')
-            self._log('debug', traceback.format_exc(), 'debug')
+            self._log('debug', traceback.format_exc, 'debug')
             raise InvalidSession("Ошибка сети при получении TG Web Data в TapperBot")
         except Exception as e:
             if 'User is unauthorized' in str(e):
                 self._log('error', f'Сессия невалидна: {str(e)}', 'error')
                 raise InvalidSession(f'User is unauthorized: {str(e)}')
             self._log('error', f"Неизвестная ошибка при получении TG Web Data в TapperBot: {str(e)}", 'error')
-            self._log('debug', traceback.format_exc(), 'debug')
+            self._log('debug', traceback.format_exc, 'debug')
             raise InvalidSession("Критическая ошибка при получении TG Web Data в TapperBot")
+        finally:
+            self._event('tg_web_data', status, started, endpoint=app_name)
 
     async def check_and_update_proxy(self, accounts_config: dict) -> bool:
         if not settings.USE_PROXY:
             return True
-        if not self._current_proxy or not await check_proxy(self._current_proxy):
+        assigned_proxy = accounts_config.get(self.session_name, {}).get('proxy')
+        if assigned_proxy and assigned_proxy != self._current_proxy and await is_proxy_alive(assigned_proxy):
+            await self._switch_proxy(assigned_proxy, accounts_config)
+            return True
+        if not self._current_proxy or not await is_proxy_alive(self._current_proxy):
             new_proxy = await get_working_proxy(accounts_config, self._current_proxy)
             if not new_proxy:
                 return False
-            self._current_proxy = new_proxy
-            if self._http_client and not self._http_client.closed:
-                await self._http_client.close()
-            proxy_conn = {'connector': ProxyConnector.from_url(new_proxy)}
-            self._http_client = CloudflareScraper(timeout=aiohttp.ClientTimeout(60), **proxy_conn)
-            self._log('info', f'Переключен на новый прокси: {new_proxy}', 'proxy')
+            await self._switch_proxy(new_proxy, accounts_config)
+        return True
+
+    async def _switch_proxy(self, new_proxy: str, accounts_config: dict) -> None:
+        self._current_proxy = new_proxy
+        self.proxy = new_proxy
+        # Telegram clients are connected per operation, so the new proxy is used on the next connect
+        self.tg_client.set_proxy(Proxy.from_str(new_proxy))
+        old_client = self._http_client
+        if old_client and not old_client.closed:
+            # A new session on the same cookie jar; the old one is closed once its requests are done
+            self._http_client = self._create_http_client(connector=ProxyConnector.from_url(new_proxy),
+                                                         cookie_jar=old_client.cookie_jar)
+            self._retire_http_client(old_client)
+        else:
+            self._http_client = self._create_http_client(connector=ProxyConnector.from_url(new_proxy))
+            if self._auth_token:
+                self._set_auth_cookie()
+
+        session_config = accounts_config.get(self.session_name)
+        if session_config is not None and session_config.get('proxy') != new_proxy:
+            session_config['proxy'] = new_proxy
+            await config_utils.update_config_file(CONFIG_PATH, self._set_config_proxy)
+            get_proxy_registry(PROXIES_PATH).assign(self.session_name, new_proxy)
+        self._log('info', f'Переключен на новый прокси: {new_proxy}', 'proxy')
+
+    def _set_config_proxy(self, accounts_config: dict) -> bool:
+        # Only the proxy is written, so changes made by others since this session read the config are kept
+        session_config = accounts_config.get(self.session_name)
+        if session_config is None or session_config.get('proxy') == self.proxy:
+            return False
+        session_config['proxy'] = self.proxy
         return True
 
     async def initialize_session(self) -> bool:
@@ -149,26 +202,33 @@ class TapperBot:
             self._log('error', f'Ошибка инициализации сессии: {str(e)}', 'error')
             return False
 
-    async def make_request(self, method: str, url: str, **kwargs) -> Optional[Dict]:
+    async def make_request(self, method: str, url: str, stage: str = 'http', **kwargs) -> Optional[Dict]:
         if not self._http_client:
             raise InvalidSession("HTTP client not initialized")
+        endpoint = url.replace(self.BASE_URL, '')
+        started = monotonic()
         try:
             async with getattr(self._http_client, method.lower())(url, **kwargs) as response:
                 if response.status == 200:
                     result = await response.json()
-                    await asyncio.sleep(random.uniform(1, 3))
+                    self._event(stage, response.status, started, endpoint)
+                    await self._sleep(random.uniform(1, 3))
                     return result
                 elif response.status == 201:
                     result = await response.json()
-                    await asyncio.sleep(random.uniform(1, 3))
+                    self._event(stage, response.status, started, endpoint)
+                    await self._sleep(random.uniform(1, 3))
                     return result
+                self._event(stage, response.status, started, endpoint)
                 self._log('error', f'Запрос {method} {url} завершился со статусом {response.status}', 'error')
-                self._log('debug', f'Ответ: {await response.text()}', 'debug')
-                await asyncio.sleep(random.uniform(1, 3))
+                if settings.DEBUG_LOGGING:
+                    self._log('debug', f'Ответ: {await response.text()}', 'debug')
+                await self._sleep(random.uniform(1, 3))
                 return None
         except Exception as e:
+            self._event(stage, 'error', started, endpoint)
             self._log('error', f'Ошибка запроса {method} {url}: {str(e)}', 'error')
-            self._log('debug', traceback.format_exc(), 'debug')
+            self._log('debug', traceback.format_exc, 'debug')
             return None
 
     async def run(self) -> None:
@@ -176,16 +236,19 @@ class TapperBot:
             raise InvalidSession("Failed to initialize session")
         random_delay = uniform(1, settings.SESSION_START_DELAY)
         self._log('info', f'Бот запустится через ⌚<g> {int(random_delay)}s </g>' , 'sleep')
-        await asyncio.sleep(random_delay)
+        await self._sleep(random_delay)
         proxy_conn = {'connector': ProxyConnector.from_url(self._current_proxy)} if self._current_proxy else {}
-        async with CloudflareScraper(timeout=aiohttp.ClientTimeout(60), **proxy_conn) as http_client:
-            self._http_client = http_client
+        # Not `async with`: a proxy switch replaces the session, and the current one is closed at the end
+        self._http_client = self._create_http_client(**proxy_conn)
+        try:
             while True:
                 try:
-                    session_config = config_utils.get_session_config(self.session_name, CONFIG_PATH)
-                    if not await self.check_and_update_proxy(session_config):
+                    accounts_config = config_utils.read_config_file(CONFIG_PATH)
+                    with profiler.stage('check_proxy'):
+                        proxy_ok = await self.check_and_update_proxy(accounts_config)
+                    if not proxy_ok:
                         self._log('warning', 'Не удалось найти рабочий прокси. Сон 5 минут.', 'proxy')
-                        await asyncio.sleep(300)
+                        await self._sleep(300)
                         continue
                     await self.process_bot_logic()
                 except InvalidSession as error:
@@ -194,40 +257,56 @@ class TapperBot:
                 except Exception as error:
                     sleep_duration = uniform(60, 120)
                     self._log('error', f'Неизвестная ошибка: {error}. Сон на {int(sleep_duration)}s', 'error')
-                    self._log('debug', traceback.format_exc(), 'debug')
-                    await asyncio.sleep(sleep_duration)
-
-    def _get_headers(self, user_agent: str = None, extra: dict = None) -> dict:
-        headers = HEADERS.copy()
-        headers['user-agent'] = user_agent or self._user_agent or generate_random_user_agent()
-        if extra:
-            headers.update(extra)
-        return headers
-
-    def _get_cookies(self) -> dict:
-        return {
-            "auth_token": self._auth_token or "",
-            "i18next": "ru"
-        }
+                    self._log('debug', traceback.format_exc, 'debug')
+                    await self._sleep(sleep_duration)
+        finally:
+            retiring = list(self._retiring_http_clients)
+            for task in retiring:
+                task.cancel()
+            await asyncio.gather(*retiring, return_exceptions=True)
+            await self._http_client.close()
+
+    def _create_http_client(self, **kwargs) -> CloudflareScraper:
+        # Headers and cookies are session defaults, so requests pass neither
+        return CloudflareScraper(timeout=aiohttp.ClientTimeout(60), headers=self._headers, cookies=COOKIES, **kwargs)
+
+    def _retire_http_client(self, http_client: CloudflareScraper) -> None:
+        task = asyncio.create_task(self._close_when_idle(http_client))
+        self._retiring_http_clients.add(task)
+        task.add_done_callback(self._retiring_http_clients.discard)
+
+    @staticmethod
+    async def _close_when_idle(http_client: CloudflareScraper) -> None:
+        # New requests go to the new session, and the ones already running on this one end within its timeout
+        try:
+            await asyncio.sleep(http_client.timeout.total)
+        finally:
+            await http_client.close()
+
+    def _set_auth_cookie(self) -> None:
+        # One host-independent auth_token, also replacing the one stored from Set-Cookie
+        cookie_jar = self._http_client.cookie_jar
+        cookie_jar.clear(lambda morsel: morsel.key == 'auth_token')
+        cookie_jar.update_cookies({'auth_token': self._auth_token})
 
     async def login_giftopia(self) -> bool:
         if not self._init_data:
-            await self.get_tg_web_data(app_name="giftopia_gamebot", path="start")
+            with profiler.stage('tg_web_data'):
+                await self.get_tg_web_data(app_name="giftopia_gamebot", path="start")
         if not self._init_data:
             self._log('info', 'Не удалось получить init_data для логина.', 'warning')
             return False
         try:
             self._log('debug', f'Init data для логина: {self._init_data}', 'debug')
-            headers = self._get_headers()
             data = {"telegramData": self._init_data}
+            started = monotonic()
             async with self._http_client.post(
                 f"{self.BASE_URL}/api/auth/authenticate",
-                headers=headers,
-                json=data,
-                cookies=self._get_cookies()
+                json=data
             ) as response:
                 resp_json = await response.json()
-                await asyncio.sleep(random.uniform(1, 3))
+                self._event('login', response.status, started, '/api/auth/authenticate')
+                await self._sleep(random.uniform(1, 3))
                 if response.status not in (200, 201):
                     self._log('error', f'Ошибка логина: {response.status} {await response.text()}', 'error')
                     return False
@@ -240,6 +319,8 @@ class TapperBot:
                     self._log('debug', f'auth_token получен из JSON: {self._auth_token}', 'success')
                 else:
                     self._log('warning', 'auth_token не получен после логина, но логин успешен.', 'warning')
+                if self._auth_token:
+                    self._set_auth_cookie()
                 if resp_json.get("status") is True and resp_json.get("data", {}).get("user"):
                     self._log('debug', 'Успешный логин, пользователь получен.', 'success')
                     return True
@@ -249,47 +330,62 @@ class TapperBot:
             self._log('error', f'Ошибка логина: {exc}', 'error')
             return False
 
-    async def _request_giftopia(self, method: str, url: str, **kwargs) -> dict:
-        headers = self._get_headers()
-        cookies = self._get_cookies()
-        async with self._http_client.request(method, url, headers=headers, cookies=cookies, **kwargs) as response:
+    async def _request_giftopia(self, method: str, url: str, stage: str = 'http', **kwargs) -> dict:
+        started = monotonic()
+        async with self._http_client.request(method, url, **kwargs) as response:
+            self._event(stage, response.status, started, url.replace(self.BASE_URL, ''))
             if response.status != 200:
                 self._log('error', f'Ошибка запроса {url}: {response.status} {await response.text()}', 'error')
-                await asyncio.sleep(random.uniform(1, 3))
+                await self._sleep(random.uniform(1, 3))
                 return {}
             result = await response.json()
-            await asyncio.sleep(random.uniform(1, 3))
+            await self._sleep(random.uniform(1, 3))
             return result
 
     async def get_mission_status(self) -> dict:
         url = f"{self.BASE_URL}/api/missions/user"
-        return await self._request_giftopia("GET", url)
+        return await self._request_giftopia("GET", url, stage='mission_status')
 
     async def check_mission(self, completed: bool = True) -> dict:
         url = f"{self.BASE_URL}/api/missions/check"
         data = {"completed": completed}
-        return await self._request_giftopia("POST", url, json=data)
+        return await self._request_giftopia("POST", url, stage='mission_check', json=data)
 
     async def get_translation(self, lang: str = "ru") -> dict:
         url = f"{self.BASE_URL}/locales/{lang}/translation.json"
-        return await self._request_giftopia("GET", url)
+        started = monotonic()
+        status, translation = await asset_cache.fetch(self._http_client, url)
+        self._event('translation', status, started, url.replace(self.BASE_URL, ''))
+        if translation is None:
+            self._log('error', f'Ошибка запроса {url}: {status}', 'error')
+        if status != 'cached':
+            await self._sleep(random.uniform(1, 3))
+        return translation or {}
 
     async def process_bot_logic(self) -> None:
+        self._cycle += 1
+        cycle_started = monotonic()
         self._log('debug', 'Запуск логики бота-тапера.', 'info')
-        if not await self.login_giftopia():
+        with profiler.stage('login'):
+            logged_in = await self.login_giftopia()
+        if not logged_in:
+            self._event('cycle', 'login_failed', cycle_started)
             self._log('error', 'Не удалось выполнить логин. Пропускаю выполнение.', 'error')
-            await asyncio.sleep(60)
+            await self._sleep(60)
             return
-        await self._get_user_data()
+        with profiler.stage('user_data'):
+            await self._get_user_data()
 
         # Попытка подтвердить миссию сразу
         self._log('info', 'Попытка подтвердить текущую миссию...', 'mission')
-        completed_attempt_response = await self.complete_mission(completed=True)
+        with profiler.stage('mission_check'):
+            completed_attempt_response = await self.complete_mission(completed=True)
 
         mission_data_after_attempt = None
         if completed_attempt_response and completed_attempt_response.get('status') is True and completed_attempt_response.get('data'):
             mission_data_after_attempt = completed_attempt_response['data'].get('mission')
             if mission_data_after_attempt:
+                self._mission_seq = mission_data_after_attempt.get('sequence', self._mission_seq)
                 status_after_attempt = mission_data_after_attempt.get('status')
                 self._log('info', f'Статус миссии после попытки подтверждения: {status_after_attempt}', 'mission')
 
@@ -299,7 +395,8 @@ class TapperBot:
                 # Если миссия активна и требует подписки (sequence 1 или наличие ссылок)
                 elif status_after_attempt == 'ACTIVE' and (mission_data_after_attempt.get('sequence') == 1 or mission_data_after_attempt.get('channel_url') or mission_data_after_attempt.get('link') or mission_data_after_attempt.get('url')):
                     self._log('info', 'Миссия активна и требует подписки. Выполняю подписку...', 'mission')
-                    await self._process_subscription_mission(mission_data_after_attempt)
+                    with profiler.stage('subscription'):
+                        await self._process_subscription_mission(mission_data_after_attempt)
                     # После подписки, попытка подтвердить миссию снова
                     self._log('info', 'Попытка подтвердить миссию после подписки...', 'mission')
                     completed_after_sub_response = await self.complete_mission(completed=True)
@@ -318,7 +415,7 @@ class TapperBot:
                      # так что если она еще не COMPLETED, возможно, есть проблема или нужно подождать.
                      # Добавляем небольшую паузу перед проверкой статуса.
                      self._log('info', 'Ожидание перед повторной проверкой статуса миссии missionType 2.', 'sleep')
-                     await asyncio.sleep(random.uniform(10, 30))
+                     await self._sleep(random.uniform(10, 30))
 
             else:
                 self._log('warning', 'В ответе после попытки подтверждения нет данных о миссии.', 'warning')
@@ -327,7 +424,9 @@ class TapperBot:
 
         # Проверяем статус миссии для определения времени следующей
         # Используем _check_mission_status, который сам делает запрос и парсит время
-        sleep_duration = await self._check_mission_status()
+        with profiler.stage('mission_status'):
+            sleep_duration = await self._check_mission_status()
+        self._event('cycle', 'ok', cycle_started)
 
         if sleep_duration is not None and sleep_duration > 60:
             extra_delay = random.randint(settings.SLEEP_MIN, settings.SLEEP_MAX) # Используем стандартные настройки задержки
@@ -335,12 +434,14 @@ class TapperBot:
             hours, remainder = divmod(total_sleep, 3600)
             minutes, seconds = divmod(remainder, 60)
             self._log('info', f'Сессия засыпает на ⌚<g> {int(hours)}ч {int(minutes)}м {int(seconds)}с </g> до следующей миссии.', 'sleep')
-            await asyncio.sleep(total_sleep)
+            self._release_tg_client(total_sleep)
+            self._event('sleep', 'ok', duration_s=int(total_sleep))
+            await self._sleep(total_sleep)
             self._log('info', 'Сессия проснулась.', 'sleep')
         else:
             # Стандартная пауза, если время следующей миссии не определено или очень мало
             self._log('debug', 'Стандартная пауза перед следующим циклом.', 'sleep')
-            await asyncio.sleep(uniform(settings.SLEEP_MIN, settings.SLEEP_MAX))
+            await self._sleep(uniform(settings.SLEEP_MIN, settings.SLEEP_MAX))
 
     def _get_sleep_duration_from_expires(self, expires_at_str: str) -> Optional[int]:
         try:
@@ -358,14 +459,12 @@ class TapperBot:
             self._log('warning', 'HTTP client is not initialized or closed.', 'warning')
             return None
         try:
-            headers = self._get_headers()
             data = {"completed": completed}
             self._log('info', f'Attempting to complete mission with data: {data}', 'mission')
             response = await self.make_request(
                 'POST',
                 f"{self.BASE_URL}/api/missions/check",
-                headers=headers,
-                cookies=self._get_cookies(),
+                stage='mission_check',
                 json=data
             )
             if response and response.get('status') is True:
@@ -375,7 +474,7 @@ class TapperBot:
             return response
         except Exception as e:
             self._log('error', f'Error completing mission: {str(e)}', 'error')
-            self._log('debug', traceback.format_exc(), 'debug')
+            self._log('debug', traceback.format_exc, 'debug')
             return None
 
     async def _check_mission_status(self) -> Optional[int]:
@@ -384,18 +483,17 @@ class TapperBot:
             return None
         sleep_duration_seconds = None
         try:
-            headers = self._get_headers()
             self._log('info', 'Проверка статуса миссии...', 'mission')
             response = await self.make_request(
                 'GET',
                 f"{self.BASE_URL}/api/missions/user",
-                headers=headers,
-                cookies=self._get_cookies()
+                stage='mission_status'
             )
             mission_data = None
             if response and response.get('status') is True and response.get('data'):
                 mission_data = response['data'].get('mission')
                 if mission_data:
+                    self._mission_seq = mission_data.get('sequence', self._mission_seq)
                     mission_status = mission_data.get('status')
                     streak = mission_data.get('streak')
                     start_at_str = mission_data.get('startAt')
@@ -438,13 +536,14 @@ class TapperBot:
                 self._log('error', f'Ошибка при проверке статуса миссии: {response}', 'error')
         except Exception as e:
             self._log('error', f'Исключение при проверке статуса миссии: {str(e)}', 'error')
-            self._log('debug', traceback.format_exc(), 'debug')
+            self._log('debug', traceback.format_exc, 'debug')
         return sleep_duration_seconds
 
     async def _get_user_data(self) -> None:
         if not self._init_data:
              self._log('warning', 'Отсутствует init_data для получения данных пользователя.', 'warning')
-             await self.get_tg_web_data(app_name="giftopia_gamebot", path="start")
+             with profiler.stage('tg_web_data'):
+                 await self.get_tg_web_data(app_name="giftopia_gamebot", path="start")
              if not self._init_data:
                  self._log('error', 'Не удалось получить init_data для данных пользователя.', 'error')
                  return
@@ -452,13 +551,12 @@ class TapperBot:
             self._log('warning', 'HTTP client не инициализирован или закрыт.', 'warning')
             return
         try:
-            headers = self._get_headers()
             data = {"telegramData": self._init_data}
             self._log('debug', 'Запрос данных пользователя...', 'info')
             response = await self.make_request(
                 'POST',
                 f"{self.BASE_URL}/api/auth/authenticate",
-                headers=headers,
+                stage='user_data',
                 json=data
             )
             if response and response.get('status') is True and response.get('data'):
@@ -475,7 +573,11 @@ class TapperBot:
                 self._log('error', f'Ошибка при получении данных пользователя: {response}', 'error')
         except Exception as e:
             self._log('error', f'Исключение при получении данных пользователя: {str(e)}', 'error')
-            self._log('debug', traceback.format_exc(), 'debug')
+            self._log('debug', traceback.format_exc, 'debug')
+
+    def _release_tg_client(self, sleep_duration: float) -> None:
+        if 0 < settings.TG_CLIENT_RELEASE_AFTER <= sleep_duration and self.tg_client.release():
+            self._log('debug', 'Telegram клиент выгружен на время сна.', 'sleep')
 
     async def _sleep_until_next_mission(self, duration: int) -> None:
         if duration <= 0:
@@ -484,14 +586,13 @@ class TapperBot:
         hours, remainder = divmod(duration, 3600)
         minutes, seconds = divmod(remainder, 60)
         self._log('info', f'Сессия засыпает на {int(hours)}ч {int(minutes)}м {int(seconds)}с до следующей миссии.', 'sleep')
-        await asyncio.sleep(duration)
+        self._release_tg_client(duration)
+        await self._sleep(duration)
         self._log('info', 'Сессия проснулась.', 'sleep')
 
-    async def _process_subscription_mission(self, mission_data: dict) -> None:
+    @staticmethod
+    def _subscription_channel_url(mission_data: dict) -> Optional[str]:
         sequence = mission_data.get("sequence")
-        status = mission_data.get("status")
-        reward = mission_data.get("reward")
-        mission_title = mission_data.get("title")
         channel_url = (
             mission_data.get("channel_url")
             or mission_data.get("link")
@@ -503,9 +604,17 @@ class TapperBot:
             channel_url = "https://t.me/GifTopiaGame"
         if not channel_url and sequence == 12:
             channel_url = "https://t.me/giftopia_giftbot"
+        return channel_url
+
+    async def _process_subscription_mission(self, mission_data: dict) -> None:
+        sequence = mission_data.get("sequence")
+        status = mission_data.get("status")
+        reward = mission_data.get("reward")
+        mission_title = mission_data.get("title")
+        channel_url = self._subscription_channel_url(mission_data)
         self._log(
             "debug",
-            f"Данные миссии: {json.dumps(mission_data, ensure_ascii=False)}",
+            lambda: f"Данные миссии: {json.dumps(mission_data, ensure_ascii=False)}",
             "debug"
         )
         if not channel_url:
@@ -527,20 +636,25 @@ class TapperBot:
             f"Выполняется переход/подписка по ссылке: {channel_url}",
             "mission"
         )
-        try:
-            await self.tg_client.join_and_mute_tg_channel(channel_url)
-            self._log(
-                "success",
-                f"Успешно выполнено действие по ссылке: {channel_url}",
-                "success"
-            )
-        except Exception as exc:
+        started = monotonic()
+        subscription = subscription_executor.subscribe(self.tg_client, channel_url)
+        queued = subscription_executor.announce(channel_url)
+        if queued:
+            self._log("debug", f"Подписка на {channel_url} поставлена в очередь для {queued} сессий", "mission")
+        subscribed = await subscription
+        self._event('subscribe', 'ok' if subscribed else 'error', started, channel_url)
+        if not subscribed:
             self._log(
                 "error",
-                f"Ошибка при выполнении действия по ссылке: {channel_url} | {exc}",
+                f"Ошибка при выполнении действия по ссылке: {channel_url}",
                 "error"
             )
             return
+        self._log(
+            "success",
+            f"Успешно выполнено действие по ссылке: {channel_url}",
+            "success"
+        )
         completed = await self.complete_mission(completed=True)
         if completed:
             self._log(
@@ -555,6 +669,21 @@ class TapperBot:
                 "error"
             )
 
+    async def _on_subscription_completed(self, channel_url: str) -> None:
+        if not self._http_client or self._http_client.closed or not self._auth_token:
+            return
+        # The announced channel may belong to a mission this session has not reached yet or already passed
+        response = await self.get_mission_status()
+        mission = (response.get('data') or {}).get('mission') if response and response.get('status') is True else None
+        if not mission or mission.get('status') != 'ACTIVE' or self._subscription_channel_url(mission) != channel_url:
+            self._log("debug", f"Подписка на {channel_url} выполнена, но текущая миссия другая", "mission")
+            return
+        self._log("info", f"Подписка на {channel_url} выполнена по анонсу другой сессии, подтверждаю миссию", "mission")
+        await self.complete_mission(completed=True)
+
 async def run_tapper(tg_client: UniversalTelegramClient) -> None:
     bot = TapperBot(tg_client=tg_client)
-    await bot.run()
+    try:
+        await bot.run()
+    finally:
+        subscription_executor.unregister(tg_client)
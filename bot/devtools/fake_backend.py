@@ -0,0 +1,195 @@
+import asyncio
+import os
+import random
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Iterator, Optional
+from urllib.parse import quote
+
+from better_proxy import Proxy
+
+from bot.utils import universal_telegram_client
+from bot.utils.async_lock import AsyncInterProcessLock
+from bot.utils.tg_backends import TelegramBackend
+from bot.utils.tg_cache import PeerCache, MembershipCache
+from bot.utils.universal_telegram_client import UniversalTelegramClient
+
+
+class FakeFloodWait(Exception):
+    def __init__(self, seconds: int):
+        super().__init__(f"A wait of {seconds} seconds is required")
+        self.value = seconds
+
+
+class FakeUnauthorized(Exception):
+    pass
+
+
+class FakeAlreadyParticipant(Exception):
+    pass
+
+
+@dataclass
+class FakeBackendConfig:
+    rpc_latency: float = 0.05
+    connect_latency: float = 0.2
+    disconnect_latency: float = 0.05
+    flood_rate: float = 0.0
+    flood_seconds: int = 1
+    auth_error_rate: float = 0.0
+
+
+class FakeBackend(TelegramBackend):
+    """In-process TelegramBackend that simulates RPC and connection costs, FloodWait and auth errors.
+
+    Every call is counted in `stats`, so benchmarks can report connection churn and RPC volume.
+    """
+
+    name = 'fake'
+    flood_errors = (FakeFloodWait,)
+    unauthorized_errors = (FakeUnauthorized,)
+    already_participant_errors = (FakeAlreadyParticipant,)
+
+    def __init__(self, session_name: str, config: Optional[FakeBackendConfig] = None, dc_id: int = 2):
+        super().__init__(client=None)
+        self.config = config or FakeBackendConfig()
+        self.stats: Counter = Counter()
+        self._session_name = session_name
+        self._dc_id = dc_id
+        self._connected = False
+
+    @property
+    def session_name(self) -> str:
+        return self._session_name
+
+    @property
+    def dc_id(self) -> int:
+        return self._dc_id
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    def has_proxy(self) -> bool:
+        return self.proxy is not None
+
+    def set_proxy(self, proxy: Proxy) -> None:
+        self.proxy = {'url': proxy.as_url}
+
+    def flood_seconds(self, error: Exception) -> int:
+        return error.value
+
+    async def connect(self) -> None:
+        self.stats['connect'] += 1
+        await asyncio.sleep(self.config.connect_latency)
+        if random.random() < self.config.auth_error_rate:
+            raise FakeUnauthorized("The key is not registered in the system")
+        self._connected = True
+
+    async def disconnect(self) -> None:
+        self.stats['disconnect'] += 1
+        await asyncio.sleep(self.config.disconnect_latency)
+        self._connected = False
+
+    async def _rpc(self, method: str) -> None:
+        self.stats[method] += 1
+        await asyncio.sleep(self.config.rpc_latency)
+        if random.random() < self.config.flood_rate:
+            self.stats['flood_wait'] += 1
+            raise FakeFloodWait(self.config.flood_seconds)
+
+    @staticmethod
+    def _peer(peer_id: str) -> SimpleNamespace:
+        key = zlib.crc32(peer_id.lower().encode())
+        if peer_id.lower().endswith('bot'):
+            return SimpleNamespace(user_id=key, access_hash=key)
+        return SimpleNamespace(channel_id=key, access_hash=key)
+
+    async def get_me(self):
+        await self._rpc('get_me')
+        return SimpleNamespace(id=zlib.crc32(self._session_name.encode()), username=self._session_name)
+
+    async def resolve_peer(self, peer_id):
+        await self._rpc('resolve_peer')
+        return self._peer(peer_id)
+
+    def peer_from_cache(self, entry: dict):
+        if entry['type'] == 'user':
+            return SimpleNamespace(user_id=entry['id'], access_hash=entry['access_hash'])
+        return SimpleNamespace(channel_id=entry['id'], access_hash=entry['access_hash'])
+
+    def build_webview_data(self, peer, bot_shortname: str = None) -> dict:
+        return {'peer': peer, 'short_name': bot_shortname}
+
+    def _webview_url(self, start_param: str = '') -> str:
+        init_data = quote(f"user={self._session_name}&auth_date=0&hash=fake", safe='')
+        return f"https://giftopia.games/#tgWebAppData={init_data}&tgWebAppVersion=8.0&tgWebAppStartParam={start_param}"
+
+    async def request_app_webview(self, webview_data: dict, start_param: str) -> str:
+        await self._rpc('request_app_webview')
+        return self._webview_url(start_param)
+
+    async def has_start_message(self, bot_username: str) -> bool:
+        await self._rpc('get_history')
+        return True
+
+    async def start_bot(self, webview_data: dict, start: dict) -> None:
+        await self._rpc('start_bot')
+
+    async def request_webview(self, webview_data: dict, bot_url: str, start: dict) -> str:
+        await self._rpc('request_webview')
+        return self._webview_url(start.get('start_param', ''))
+
+    async def get_dialogs(self, limit: int = 100, offset: Optional[tuple] = None):
+        await self._rpc('get_dialogs')
+        return SimpleNamespace(chats=[], dialogs=[])
+
+    def dialogs_offset(self, page) -> Optional[tuple]:
+        return None
+
+    async def import_chat_invite(self, invite_hash: str) -> tuple[object, str]:
+        await self._rpc('import_chat_invite')
+        return self._peer(invite_hash), invite_hash
+
+    async def join_channel(self, peer) -> None:
+        await self._rpc('join_channel')
+
+    async def mute_peer(self, peer) -> None:
+        await self._rpc('mute_peer')
+
+    async def archive_peer(self, peer) -> None:
+        await self._rpc('archive_peer')
+
+    async def update_profile(self, **params) -> None:
+        await self._rpc('update_profile')
+
+
+class ScaledTelegramClient(UniversalTelegramClient):
+    """UniversalTelegramClient whose built-in human-like pauses are multiplied by `pause_scale`."""
+
+    pause_scale = 0.0
+
+    async def _sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds * self.pause_scale)
+
+
+def create_fake_client(session_name: str, config: Optional[FakeBackendConfig] = None, dc_id: int = 2,
+                       lock_dir: Optional[str] = None) -> ScaledTelegramClient:
+    tg_client = ScaledTelegramClient(backend=FakeBackend(session_name, config, dc_id))
+    if lock_dir:
+        tg_client.lock = AsyncInterProcessLock(os.path.join(lock_dir, f"{session_name}.lock"))
+    return tg_client
+
+
+@contextmanager
+def use_temporary_caches(directory: str) -> Iterator[None]:
+    """Point the peer and membership caches at `directory` so fake sessions don't touch the real ones."""
+    caches = universal_telegram_client.peer_cache, universal_telegram_client.membership_cache
+    universal_telegram_client.peer_cache = PeerCache(os.path.join(directory, 'peer_cache.json'))
+    universal_telegram_client.membership_cache = MembershipCache(os.path.join(directory, 'membership_cache.json'))
+    try:
+        yield
+    finally:
+        universal_telegram_client.peer_cache, universal_telegram_client.membership_cache = caches
@@ -0,0 +1,192 @@
+"""Drive simulated sessions through TapperBot.process_bot_logic against the local mock API.
+
+    python -m bot.devtools.load_test --sessions 100 --cycles 5 --latency 0.05
+
+Telegram is replaced by UniversalTelegramClient on a FakeBackend, and the pauses of
+both the bot and the client are scaled by --pause-scale (0 by default), so the numbers
+reflect the bot's overhead plus the configured mock and fake RPC latency. Use the
+report as the baseline when changing the hot path.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+from contextlib import ExitStack, contextmanager
+from time import perf_counter
+from typing import Any, Iterator
+
+from loguru import logger as _logger
+
+from bot.config import settings
+from bot.core import tapper
+from bot.core.subscriptions import subscription_executor
+from bot.core.tapper import TapperBot
+from bot.devtools.fake_backend import FakeBackendConfig, ScaledTelegramClient, create_fake_client, use_temporary_caches
+from bot.devtools.mock_api import MockConfig, start_mock_server
+from bot.utils.asset_cache import AssetCache
+from bot.utils.logger import console_filter
+
+
+class LoadTestTapperBot(TapperBot):
+    pause_scale = 0.0
+
+    async def _sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds * self.pause_scale)
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def rss_bytes() -> int:
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def open_fds() -> int:
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return -1
+
+
+@contextmanager
+def override(target: Any, name: str, value: Any) -> Iterator[None]:
+    saved = getattr(target, name)
+    setattr(target, name, value)
+    try:
+        yield
+    finally:
+        setattr(target, name, saved)
+
+
+@contextmanager
+def working_directory(path: str) -> Iterator[None]:
+    saved = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(saved)
+
+
+def prepare_accounts_config(config_dir: str, session_names: list[str]) -> str:
+    config_path = os.path.join(config_dir, 'accounts_config.json')
+    accounts = {name: {'api': {}, 'user_agent': 'Mozilla/5.0 (load test)'} for name in session_names}
+    with open(config_path, 'w') as file:
+        json.dump(accounts, file)
+    return config_path
+
+
+async def run_session(bot: TapperBot, cycles: int, latencies: list[float], peak_fds: list[int]) -> int:
+    done = 0
+    async with bot._create_http_client() as http_client:
+        bot._http_client = http_client
+        for _ in range(cycles):
+            started = perf_counter()
+            try:
+                await bot.process_bot_logic()
+                done += 1
+            except Exception as e:
+                _logger.error(f"{bot.session_name} | Cycle failed: {e}")
+            latencies.append(perf_counter() - started)
+            peak_fds[0] = max(peak_fds[0], open_fds())
+    subscription_executor.unregister(bot.tg_client)
+    return done
+
+
+async def run_load_test(sessions: int, cycles: int, mock_config: MockConfig,
+                        tg_config: FakeBackendConfig, pause_scale: float = 0.0) -> dict:
+    work_dir = tempfile.mkdtemp(prefix='giftopia_load_')
+    session_names = [f"load_{index:05d}" for index in range(sessions)]
+    with ExitStack() as overrides:
+        # first_run.txt is kept in the working directory
+        overrides.enter_context(working_directory(work_dir))
+        overrides.enter_context(use_temporary_caches(work_dir))
+        overrides.enter_context(override(tapper, 'CONFIG_PATH', prepare_accounts_config(work_dir, session_names)))
+        overrides.enter_context(override(tapper, 'asset_cache', AssetCache(os.path.join(work_dir, 'asset_cache.json'))))
+        overrides.enter_context(override(LoadTestTapperBot, 'BASE_URL', LoadTestTapperBot.BASE_URL))
+        overrides.enter_context(override(LoadTestTapperBot, 'pause_scale', pause_scale))
+        overrides.enter_context(override(ScaledTelegramClient, 'pause_scale', pause_scale))
+        overrides.enter_context(override(settings, 'SUBSCRIBE_DC_INTERVAL', settings.SUBSCRIBE_DC_INTERVAL * pause_scale))
+        return await drive_sessions(work_dir, session_names, cycles, mock_config, tg_config)
+
+
+async def drive_sessions(work_dir: str, session_names: list[str], cycles: int, mock_config: MockConfig,
+                         tg_config: FakeBackendConfig) -> dict:
+    sessions = len(session_names)
+    runner, mock, base_url = await start_mock_server(mock_config)
+    try:
+        LoadTestTapperBot.BASE_URL = base_url
+        rss_before, fds_before = rss_bytes(), open_fds()
+        bots = [LoadTestTapperBot(create_fake_client(name, tg_config, dc_id=index % 5 + 1, lock_dir=work_dir))
+                for index, name in enumerate(session_names)]
+
+        latencies: list[float] = []
+        peak_fds = [fds_before]
+        started = perf_counter()
+        completed = await asyncio.gather(*(run_session(bot, cycles, latencies, peak_fds) for bot in bots))
+        elapsed = perf_counter() - started
+        rss_after = rss_bytes()
+    finally:
+        await runner.cleanup()
+
+    return {
+        'sessions': sessions,
+        'cycles': sum(completed),
+        'failed_cycles': sessions * cycles - sum(completed),
+        'elapsed_s': round(elapsed, 3),
+        'cycles_per_s': round(sum(completed) / elapsed, 2) if elapsed else 0.0,
+        'cycle_p50_ms': round(percentile(latencies, 0.5) * 1000, 1),
+        'cycle_p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+        'api_requests': mock.requests,
+        'memory_per_session_kb': round((rss_after - rss_before) / max(sessions, 1) / 1024, 1),
+        'fds_before': fds_before,
+        'fds_peak': peak_fds[0],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="TapperBot load test against the local Giftopia mock")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--cycles", type=int, default=3, help="process_bot_logic runs per session")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mock API base latency (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Mock API random extra latency (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of mock API requests failing with 500")
+    parser.add_argument("--subscription-every", type=int, default=3,
+                        help="Every N-th mission asks for a channel subscription (0 disables)")
+    parser.add_argument("--tg-latency", type=float, default=0.0, help="Fake Telegram RPC latency (seconds)")
+    parser.add_argument("--tg-connect-latency", type=float, default=0.0, help="Fake Telegram connect cost (seconds)")
+    parser.add_argument("--pause-scale", type=float, default=0.0, help="Multiplier for the bot's and client's own pauses")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show bot logs")
+    args = parser.parse_args()
+
+    _logger.remove()
+    if args.verbose:
+        _logger.add(sys.stderr, filter=console_filter)
+
+    mock_config = MockConfig(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                             subscription_every=args.subscription_every)
+    tg_config = FakeBackendConfig(rpc_latency=args.tg_latency, connect_latency=args.tg_connect_latency,
+                                  disconnect_latency=0.0)
+    report = asyncio.run(run_load_test(args.sessions, args.cycles, mock_config, tg_config, args.pause_scale))
+
+    if args.json:
+        print(json.dumps(report))
+    else:
+        for key, value in report.items():
+            print(f"{key:<24} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Local stand-in for the Giftopia API.
+
+    python -m bot.devtools.mock_api --port 8080 --latency 0.05 --error-rate 0.01
+
+Point GIFTOPIA_BASE_URL at it to run the farm offline. Every user gets its own
+mission state machine: an ACTIVE mission becomes COMPLETED when checked, and the
+next sequence becomes ACTIVE once the previous one expires.
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from time import time
+from typing import Optional
+from urllib.parse import parse_qs
+
+from aiohttp import web
+
+
+@dataclass
+class MockConfig:
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    mission_interval: float = 0.0
+    subscription_every: int = 3
+
+
+@dataclass
+class MockMission:
+    sequence: int = 1
+    status: str = 'ACTIVE'
+    streak: int = 0
+    checks: int = 0
+    completed_at: Optional[float] = None
+    expires_at: Optional[float] = None
+
+
+@dataclass
+class MockUser:
+    user_id: str
+    token: str
+    balance: int = 0
+    mission: MockMission = field(default_factory=MockMission)
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+class MockGiftopia:
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.users: dict[str, MockUser] = {}
+        self.tokens: dict[str, MockUser] = {}
+        self.requests = 0
+
+    def needs_subscription(self, mission: MockMission) -> bool:
+        every = self.config.subscription_every
+        return bool(every and mission.sequence % every == 0)
+
+    def mission_payload(self, mission: MockMission) -> dict:
+        payload = {
+            'sequence': mission.sequence,
+            'status': mission.status,
+            'streak': mission.streak,
+            'missionType': 1,
+            'title': f"Mission {mission.sequence}",
+            'reward': 10,
+        }
+        if mission.expires_at:
+            payload['expiresAt'] = _iso(mission.expires_at)
+        if self.needs_subscription(mission):
+            payload['channel_url'] = f"https://t.me/mock_channel_{mission.sequence}"
+        return payload
+
+    def advance(self, user: MockUser) -> None:
+        mission = user.mission
+        if mission.status == 'COMPLETED' and mission.expires_at and time() >= mission.expires_at:
+            user.mission = MockMission(sequence=mission.sequence + 1, streak=mission.streak)
+
+    @web.middleware
+    async def middleware(self, request: web.Request, handler):
+        self.requests += 1
+        delay = self.config.latency + random.uniform(0, self.config.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if random.random() < self.config.error_rate:
+            return web.json_response({'status': False, 'message': 'mock failure'}, status=500)
+        return await handler(request)
+
+    def _authorized(self, request: web.Request) -> MockUser:
+        user = self.tokens.get(request.cookies.get('auth_token', ''))
+        if not user:
+            raise web.HTTPUnauthorized()
+        self.advance(user)
+        return user
+
+    async def authenticate(self, request: web.Request) -> web.Response:
+        telegram_data = (await request.json()).get('telegramData', '')
+        user_id = (parse_qs(telegram_data).get('user') or [telegram_data])[0]
+        user = self.users.get(user_id)
+        if not user:
+            token = hashlib.sha1(user_id.encode()).hexdigest()
+            user = self.users[user_id] = self.tokens[token] = MockUser(user_id, token)
+        response = web.json_response({
+            'status': True,
+            'data': {
+                'auth_token': user.token,
+                'user': {'username': f"mock_{user.user_id[:16]}", 'firstName': 'Mock', 'balance': user.balance},
+            },
+        })
+        response.set_cookie('auth_token', user.token)
+        return response
+
+    async def mission_check(self, request: web.Request) -> web.Response:
+        user = self._authorized(request)
+        completed = (await request.json()).get('completed', True)
+        mission = user.mission
+        mission.checks += 1
+        # Subscription missions are only accepted on a repeated check, after the client subscribed
+        ready = not self.needs_subscription(mission) or mission.checks > 1
+        if completed and mission.status == 'ACTIVE' and ready:
+            mission.status = 'COMPLETED'
+            mission.streak += 1
+            mission.completed_at = time()
+            mission.expires_at = mission.completed_at + self.config.mission_interval
+            user.balance += 10
+        return web.json_response({'status': True, 'data': {'mission': self.mission_payload(mission)}})
+
+    async def mission_user(self, request: web.Request) -> web.Response:
+        user = self._authorized(request)
+        return web.json_response({'status': True, 'data': {'mission': self.mission_payload(user.mission)}})
+
+    async def translation(self, request: web.Request) -> web.Response:
+        lang = request.match_info['lang']
+        etag = f'"{lang}-1"'
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+        return web.json_response({'lang': lang, 'mission': 'Mission', 'balance': 'Balance'}, headers={'ETag': etag})
+
+    def create_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.middleware])
+        app.router.add_post('/api/auth/authenticate', self.authenticate)
+        app.router.add_post('/api/missions/check', self.mission_check)
+        app.router.add_get('/api/missions/user', self.mission_user)
+        app.router.add_get('/locales/{lang}/translation.json', self.translation)
+        return app
+
+
+async def start_mock_server(config: MockConfig, host: str = '127.0.0.1',
+                            port: int = 0) -> tuple[web.AppRunner, MockGiftopia, str]:
+    """Start the mock in the running loop; returns the runner, the state and its base URL."""
+    mock = MockGiftopia(config)
+    runner = web.AppRunner(mock.create_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = runner.addresses[0][1]
+    return runner, mock, f"http://{host}:{bound_port}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local Giftopia API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="Base response delay (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random delay up to this value (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with HTTP 500")
+    parser.add_argument("--mission-interval", type=float, default=0.0,
+                        help="Seconds until the next mission after one is completed")
+    parser.add_argument("--subscription-every", type=int, default=3,
+                        help="Every N-th mission asks for a channel subscription (0 disables)")
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency, args.jitter, args.error_rate, args.mission_interval, args.subscription_every)
+    web.run_app(MockGiftopia(config).create_app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
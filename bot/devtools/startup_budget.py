@@ -0,0 +1,62 @@
+"""Startup budget check for the launcher.
+
+    python -m bot.devtools.startup_budget [--budget-ms 800] [--runs 5]
+
+Imports bot.core.launcher in fresh interpreters and exits with status 1 if the median
+import time is over budget or if a module that only some actions need was imported
+eagerly. Run it from the project root after touching imports.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Modules that belong to a single action or backend and must stay out of the launcher's imports
+LAZY_MODULES = ('telethon', 'opentele', 'pyrogram', 'flask', 'werkzeug', 'waitress', 'aiocfscrape', 'js2py',
+                'bot.core.tapper', 'bot.core.registrator', 'bot.utils.web')
+
+PROBE = """
+import json, sys
+from time import perf_counter
+started = perf_counter()
+import bot.core.launcher
+elapsed = perf_counter() - started
+print(json.dumps({'import_ms': elapsed * 1000, 'modules': sorted(sys.modules)}))
+"""
+
+
+def measure_once() -> dict:
+    result = subprocess.run([sys.executable, '-c', PROBE], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def check(budget_ms: float, runs: int) -> list[str]:
+    samples = [measure_once() for _ in range(runs)]
+    median_ms = statistics.median(sample['import_ms'] for sample in samples)
+    print(f"Launcher import | median {median_ms:.0f} ms over {runs} run(s) | budget {budget_ms:.0f} ms")
+
+    problems = []
+    if median_ms > budget_ms:
+        problems.append(f"import took {median_ms:.0f} ms, budget is {budget_ms:.0f} ms")
+    loaded = set(samples[-1]['modules'])
+    for module in LAZY_MODULES:
+        if module in loaded:
+            problems.append(f"{module} is imported eagerly")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fail if the launcher's import time is over budget")
+    parser.add_argument("--budget-ms", type=float, default=800.0, help="Allowed median import time")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to sample")
+    args = parser.parse_args()
+
+    problems = check(args.budget_ms, max(args.runs, 1))
+    for problem in problems:
+        print(f"FAIL | {problem}", file=sys.stderr)
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Import-time and cold-start breakdown for `python main.py --profile-startup`.
+
+`enable()` has to run before the bot's modules are imported: from then on every first
+import is timed, and `mark()` closes a startup phase. `report()` prints both once. All
+functions are no-ops until `enable()` is called, so the launcher can call them freely.
+Only the standard library is imported here to keep the measurement clean.
+"""
+import builtins
+import importlib
+import sys
+import threading
+from collections import defaultdict
+from importlib.util import resolve_name
+from time import perf_counter
+from typing import Optional
+
+TOP_PACKAGES = 15
+
+_started = perf_counter()
+_enabled = False
+_reported = False
+_marks: list[tuple[str, float]] = []
+# Module -> time spent importing it, without the modules it imported in turn
+_self_times: defaultdict[str, float] = defaultdict(float)
+_stack: list[float] = []
+_thread_id: Optional[int] = None
+_original_import = builtins.__import__
+_original_import_module = importlib.import_module
+
+
+def _is_loaded(name: str, fromlist) -> bool:
+    if name not in sys.modules:
+        return False
+    return not fromlist or all(
+        item == '*' or hasattr(sys.modules[name], item) or f"{name}.{item}" in sys.modules for item in fromlist)
+
+
+def _timed(name: str, fromlist, load):
+    if threading.get_ident() != _thread_id or _is_loaded(name, fromlist):
+        return load()
+    started = perf_counter()
+    _stack.append(0.0)
+    try:
+        return load()
+    finally:
+        elapsed = perf_counter() - started
+        children = _stack.pop()
+        _self_times[name] += elapsed - children
+        if _stack:
+            _stack[-1] += elapsed
+
+
+def _import(name, globals=None, locals=None, fromlist=(), level=0):
+    load = lambda: _original_import(name, globals, locals, fromlist, level)
+    absolute = name
+    if level:
+        try:
+            absolute = resolve_name('.' * level + name, (globals or {}).get('__package__'))
+        except (ImportError, ValueError):
+            return load()
+    return _timed(absolute, fromlist, load)
+
+
+def _import_module(name, package=None):
+    absolute = resolve_name(name, package) if name.startswith('.') else name
+    return _timed(absolute, (), lambda: _original_import_module(name, package))
+
+
+def enable() -> None:
+    global _enabled, _thread_id
+    if _enabled:
+        return
+    _enabled = True
+    _thread_id = threading.get_ident()
+    builtins.__import__ = _import
+    importlib.import_module = _import_module
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def mark(phase: str) -> None:
+    """Ends a startup phase; its duration is the time since the previous mark."""
+    if _enabled:
+        _marks.append((phase, perf_counter()))
+
+
+def _package(module: str) -> str:
+    parts = module.split('.')
+    return '.'.join(parts[:2]) if parts[0] == 'bot' else parts[0]
+
+
+def format_report() -> str:
+    by_package: defaultdict[str, float] = defaultdict(float)
+    for module, seconds in _self_times.items():
+        by_package[_package(module)] += seconds
+    imports_total = sum(by_package.values())
+
+    lines = [f"Startup profile | {len(_self_times)} modules imported in {imports_total * 1000:.0f} ms", "",
+             f"{'package':<32} {'self ms':>9} {'share':>7}"]
+    for package, seconds in sorted(by_package.items(), key=lambda item: -item[1])[:TOP_PACKAGES]:
+        lines.append(f"{package:<32} {seconds * 1000:>9.1f} {seconds / imports_total:>7.1%}")
+
+    lines += ["", f"{'phase':<32} {'ms':>9} {'total ms':>9}"]
+    previous = _started
+    for phase, at in _marks:
+        lines.append(f"{phase:<32} {(at - previous) * 1000:>9.1f} {(at - _started) * 1000:>9.1f}")
+        previous = at
+    return '\n'.join(lines)
+
+
+def report() -> None:
+    """Prints the breakdown once and stops timing imports."""
+    global _reported
+    if not _enabled or _reported:
+        return
+    _reported = True
+    builtins.__import__ = _original_import
+    importlib.import_module = _original_import_module
+    print(format_report(), file=sys.stderr, flush=True)
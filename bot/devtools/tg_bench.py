@@ -0,0 +1,127 @@
+"""Benchmark the Telegram side of a cycle on FakeBackend sessions.
+
+    python -m bot.devtools.tg_bench --sessions 10 100 1000 --rounds 3
+
+Each round every session fetches the app webview URL, joins and mutes a new channel
+and updates its profile, the way a mission cycle does. Reported per farm size:
+end-to-end round latency, session lock wait (contention), connects/disconnects per
+round (connection churn), RPC volume and FloodWaits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from collections import Counter
+from time import perf_counter
+
+from loguru import logger as _logger
+
+from bot.devtools.fake_backend import FakeBackendConfig, ScaledTelegramClient, create_fake_client, use_temporary_caches
+from bot.devtools.load_test import percentile
+from bot.utils.logger import console_filter
+
+
+class TimedLock:
+    """Wraps a session lock and records how long each acquisition waited."""
+
+    def __init__(self, lock, waits: list[float]):
+        self._lock = lock
+        self._waits = waits
+
+    async def __aenter__(self) -> 'TimedLock':
+        started = perf_counter()
+        await self._lock.__aenter__()
+        self._waits.append(perf_counter() - started)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self._lock.__aexit__(exc_type, exc_val, exc_tb)
+
+
+async def run_round(tg_client: ScaledTelegramClient, round_index: int, latencies: list[float],
+                    errors: Counter) -> None:
+    started = perf_counter()
+    try:
+        await tg_client.get_app_webview_url('giftopia_gamebot', 'start', '252453226')
+        await tg_client.join_and_mute_tg_channel(f"https://t.me/bench_channel_{round_index}")
+        await tg_client.update_profile(about=f"round {round_index}")
+    except Exception as e:
+        errors[type(e).__name__] += 1
+    latencies.append(perf_counter() - started)
+
+
+async def run_benchmark(sessions: int, rounds: int, config: FakeBackendConfig, work_dir: str) -> dict:
+    lock_waits: list[float] = []
+    clients = []
+    for index in range(sessions):
+        tg_client = create_fake_client(f"bench_{index:05d}", config, dc_id=index % 5 + 1, lock_dir=work_dir)
+        tg_client.lock = TimedLock(tg_client.lock, lock_waits)
+        clients.append(tg_client)
+
+    latencies: list[float] = []
+    errors: Counter = Counter()
+    started = perf_counter()
+    for round_index in range(rounds):
+        await asyncio.gather(*(run_round(tg_client, round_index, latencies, errors) for tg_client in clients))
+    elapsed = perf_counter() - started
+
+    stats = sum((tg_client.backend.stats for tg_client in clients), Counter())
+    total_rounds = sessions * rounds
+    return {
+        'sessions': sessions,
+        'rounds': total_rounds,
+        'elapsed_s': round(elapsed, 3),
+        'rounds_per_s': round(total_rounds / elapsed, 2) if elapsed else 0.0,
+        'round_p50_ms': round(percentile(latencies, 0.5) * 1000, 1),
+        'round_p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+        'lock_wait_p50_ms': round(percentile(lock_waits, 0.5) * 1000, 2),
+        'lock_wait_p99_ms': round(percentile(lock_waits, 0.99) * 1000, 2),
+        'connects_per_round': round(stats['connect'] / total_rounds, 2),
+        'disconnects_per_round': round(stats['disconnect'] / total_rounds, 2),
+        'rpc_calls': sum(count for name, count in stats.items() if name not in ('connect', 'disconnect', 'flood_wait')),
+        'flood_waits': stats['flood_wait'],
+        'errors': dict(errors),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark UniversalTelegramClient on a fake MTProto backend")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--rpc-latency", type=float, default=0.05)
+    parser.add_argument("--connect-latency", type=float, default=0.2)
+    parser.add_argument("--disconnect-latency", type=float, default=0.05)
+    parser.add_argument("--flood-rate", type=float, default=0.0, help="Share of RPCs answered with FloodWait")
+    parser.add_argument("--flood-seconds", type=int, default=1)
+    parser.add_argument("--auth-error-rate", type=float, default=0.0, help="Share of connects failing authorization")
+    parser.add_argument("--pause-scale", type=float, default=0.0, help="Multiplier for the client's own pauses")
+    parser.add_argument("--json", action="store_true", help="Print one JSON report per line")
+    parser.add_argument("--verbose", action="store_true", help="Show client logs")
+    args = parser.parse_args()
+
+    _logger.remove()
+    if args.verbose:
+        _logger.add(sys.stderr, filter=console_filter)
+
+    config = FakeBackendConfig(args.rpc_latency, args.connect_latency, args.disconnect_latency,
+                               args.flood_rate, args.flood_seconds, args.auth_error_rate)
+    ScaledTelegramClient.pause_scale = args.pause_scale
+
+    for sessions in args.sessions:
+        work_dir = tempfile.mkdtemp(prefix='giftopia_tg_bench_')
+        # first_run.txt is kept in the working directory
+        os.chdir(work_dir)
+        with use_temporary_caches(work_dir):
+            report = asyncio.run(run_benchmark(sessions, args.rounds, config, work_dir))
+        if args.json:
+            print(json.dumps(report))
+        else:
+            print(f"--- {sessions} sessions")
+            for key, value in report.items():
+                print(f"{key:<24} {value}")
+
+
+if __name__ == "__main__":
+    main()
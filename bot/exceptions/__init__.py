@@ -4,3 +4,9 @@ class InvalidSession(Exception):
 
 class AdViewError(Exception):
     pass
+
+
+class FloodWaitDeferred(Exception):
+    def __init__(self, seconds: int):
+        super().__init__(f"FloodWait for {seconds}s")
+        self.seconds = seconds
@@ -0,0 +1,72 @@
+"""Shared cache for static Giftopia assets such as /locales/{lang}/translation.json.
+
+One session fetches an asset per ASSET_CACHE_TTL and every session is served from
+memory until it expires; the copy on disk survives restarts. Sessions asking while the
+fetch is running share it. After expiry the request is conditional (If-None-Match /
+If-Modified-Since), so an unchanged asset costs a 304.
+"""
+import os
+from time import time
+from typing import Any, Optional, Union
+
+from aiohttp import ClientSession
+
+from bot.config import settings
+from bot.utils import CONFIG_PATH
+from bot.utils.singleflight import SingleFlight
+from bot.utils.tg_cache import JsonCacheStore
+
+
+class AssetCache(JsonCacheStore):
+    """Asset body, validators and fetch time by URL."""
+
+    def __init__(self, cache_path: str):
+        super().__init__(cache_path)
+        self._fetches = SingleFlight()
+
+    def fresh(self, url: str) -> Optional[Any]:
+        entry = self.data.get(url)
+        if entry and time() - entry['fetched_at'] < settings.ASSET_CACHE_TTL:
+            return entry['body']
+        return None
+
+    async def fetch(self, http_client: ClientSession, url: str) -> tuple[Union[int, str], Optional[Any]]:
+        """Returns the upstream status, or 'cached' when no request was made, and the asset."""
+        body = self.fresh(url)
+        if body is not None:
+            return 'cached', body
+        upstream = False
+
+        async def refresh():
+            nonlocal upstream
+            upstream = True
+            return await self._refresh(http_client, url)
+
+        status, body = await self._fetches.do(url, refresh)
+        # Sessions that joined another session's fetch made no request of their own
+        return status if upstream or body is None else 'cached', body
+
+    async def _refresh(self, http_client: ClientSession, url: str) -> tuple[int, Optional[Any]]:
+        entry = self.data.get(url)
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        async with http_client.get(url, headers=headers) as response:
+            if response.status == 304 and entry:
+                entry['fetched_at'] = time()
+            elif response.status == 200:
+                entry = self.data[url] = {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'fetched_at': time(),
+                    'body': await response.json(),
+                }
+            else:
+                return response.status, None
+        await self.save(url)
+        return response.status, entry['body']
+
+
+asset_cache = AssetCache(os.path.join(os.path.dirname(CONFIG_PATH), 'asset_cache.json'))
@@ -2,20 +2,63 @@ import asyncio
 import fasteners
 from random import uniform
 from os import path
+from weakref import WeakKeyDictionary
 
 from bot.utils import logger
+from bot.utils.profiler import profiler
 
 
 class AsyncInterProcessLock:
+    # fcntl locks are held per process, so coroutines of one process are serialized here first.
+    # An asyncio lock is bound to one event loop, so they are kept per loop as [lock, users]
+    # and a lock is dropped once no coroutine holds or waits for it.
+    _local_locks: WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, list]] = WeakKeyDictionary()
+
     def __init__(self, lock_file: str):
         self._lock = fasteners.InterProcessLock(lock_file)
         self._file_name, _ = path.splitext(path.basename(lock_file))
+        self._lock_path = path.abspath(lock_file)
+
+    def _use_local_lock(self) -> asyncio.Lock:
+        locks = self._local_locks.setdefault(asyncio.get_running_loop(), {})
+        entry = locks.get(self._lock_path)
+        if entry is None:
+            entry = locks[self._lock_path] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        return entry[0]
+
+    def _leave_local_lock(self, acquired: bool = True) -> None:
+        locks = self._local_locks[asyncio.get_running_loop()]
+        entry = locks[self._lock_path]
+        if acquired:
+            entry[0].release()
+        entry[1] -= 1
+        if not entry[1]:
+            del locks[self._lock_path]
 
     async def __aenter__(self) -> 'AsyncInterProcessLock':
+        with profiler.stage('lock_wait'):
+            await self._enter()
+        return self
+
+    async def _enter(self) -> None:
+        local_lock = self._use_local_lock()
+        try:
+            await local_lock.acquire()
+        except BaseException:
+            self._leave_local_lock(acquired=False)
+            raise
+        try:
+            await self._acquire()
+        except BaseException:
+            self._leave_local_lock()
+            raise
+
+    async def _acquire(self) -> None:
         while True:
             lock_acquired = await asyncio.to_thread(self._lock.acquire, timeout=uniform(5, 10))
             if lock_acquired:
-                return self
+                return
             sleep_time = uniform(30, 150)
             logger_message = (
                 f"<LY><k>{self._file_name}</k></LY> | Failed to acquire lock for "
@@ -26,4 +69,15 @@ class AsyncInterProcessLock:
             await asyncio.sleep(sleep_time)
 
     async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
-        await asyncio.to_thread(self._lock.release)
+        try:
+            await asyncio.to_thread(self._lock.release)
+        finally:
+            self._leave_local_lock()
+
+    # Blocking use for code without an event loop; threads of the caller must be serialized by the caller
+    def __enter__(self) -> 'AsyncInterProcessLock':
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._lock.release()
@@ -1,14 +1,18 @@
 import asyncio
 import json
 from bot.utils import logger, log_error, AsyncInterProcessLock
-from opentele.api import API
+from bot.utils.profiler import profiler
 from os import path, remove
 from copy import deepcopy
+from typing import Callable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from opentele.api import API
 
 
 def read_config_file(config_path: str) -> dict:
     try:
-        with open(config_path, 'r') as file:
+        with profiler.stage('config_read'), open(config_path, 'r') as file:
             content = file.read()
             return json.loads(content) if content else {}
     except FileNotFoundError:
@@ -17,22 +21,45 @@ def read_config_file(config_path: str) -> dict:
         return {}
 
 
+def _config_lock(config_path: str) -> AsyncInterProcessLock:
+    return AsyncInterProcessLock(path.join(path.dirname(config_path), 'lock_files', 'accounts_config.lock'))
+
+
+def _dump_config(content: dict, config_path: str) -> None:
+    with profiler.stage('config_write'), open(config_path, 'w+') as file:
+        json.dump(content, file, indent=2)
+
+
 async def write_config_file(content: dict, config_path: str) -> None:
-    lock = AsyncInterProcessLock(path.join(path.dirname(config_path), 'lock_files', 'accounts_config.lock'))
-    async with lock:
-        with open(config_path, 'w+') as file:
-            json.dump(content, file, indent=2)
+    async with _config_lock(config_path):
+        _dump_config(content, config_path)
         await asyncio.sleep(0.1)
 
 
+async def update_config_file(config_path: str, update: Callable[[dict], bool]) -> dict:
+    """Re-reads the config under its lock and writes it back if `update` changed it (returned True).
+
+    Use it instead of read_config_file + write_config_file whenever other writers may be active,
+    so their changes made in between are not overwritten.
+    """
+    async with _config_lock(config_path):
+        config = read_config_file(config_path)
+        if update(config):
+            _dump_config(config, config_path)
+            await asyncio.sleep(0.1)
+        return config
+
+
 def get_session_config(session_name: str, config_path: str) -> dict:
     return read_config_file(config_path).get(session_name, {})
 
 
 async def update_session_config_in_file(session_name: str, updated_session_config: dict, config_path: str) -> None:
-    config = read_config_file(config_path)
-    config[session_name] = updated_session_config
-    await write_config_file(config, config_path)
+    def update(config: dict) -> bool:
+        config[session_name] = updated_session_config
+        return True
+
+    await update_config_file(config_path, update)
 
 
 async def restructure_config(config_path: str) -> None:
@@ -83,7 +110,9 @@ def import_session_json(session_path: str) -> dict:
     return None
 
 
-def get_api(acc_api: dict) -> API:
+def get_api(acc_api: dict) -> 'API':
+    from opentele.api import API
+
     api_generators = {
         4: API.TelegramAndroid.Generate,
         6: API.TelegramAndroid.Generate,
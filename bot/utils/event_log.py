@@ -0,0 +1,43 @@
+import json
+from time import time
+from typing import Optional, Union
+
+from loguru import logger as _logger
+
+from bot.config import settings
+
+EVENT_LOG_PATH = "logs/events_{time:YYYY-MM-DD}.jsonl"
+
+_events = _logger.bind(event=True)
+
+if settings.EVENT_LOG:
+    _logger.add(
+        EVENT_LOG_PATH,
+        format="{message}",
+        filter=lambda record: "event" in record["extra"],
+        rotation="00:00",
+        retention=settings.EVENT_LOG_RETENTION,
+        colorize=False,
+        enqueue=True
+    )
+
+
+def emit_event(session: str, stage: str, status: Union[str, int], latency: Optional[float] = None,
+               endpoint: Optional[str] = None, seq: Optional[int] = None, cycle: Optional[int] = None,
+               **extra) -> None:
+    """Append one JSON line to the event log; `latency` is in seconds and stored in milliseconds."""
+    if not settings.EVENT_LOG:
+        return
+    record = {
+        'ts': round(time(), 3),
+        'session': session,
+        'cycle': cycle,
+        'stage': stage,
+        'endpoint': endpoint,
+        'status': status,
+        'latency_ms': round(latency * 1000, 1) if latency is not None else None,
+        'seq': seq,
+        **extra
+    }
+    _events.info(json.dumps({k: v for k, v in record.items() if v is not None},
+                            separators=(',', ':'), ensure_ascii=False))
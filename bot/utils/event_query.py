@@ -0,0 +1,96 @@
+"""Per-stage latency percentiles over event log files.
+
+    python -m bot.utils.event_query logs/events_2026-10-19.jsonl [--stage login] [--session name]
+
+Files are streamed line by line and latencies are kept in a log-scale histogram, so
+memory use does not depend on the size of the log.
+"""
+import argparse
+import json
+import math
+import sys
+from collections import Counter, defaultdict
+from typing import Iterable, Optional
+
+# Histogram buckets grow by 2**(1/8) (~9%), which bounds the percentile error
+BUCKETS_PER_DOUBLING = 8
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.buckets: Counter = Counter()
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, latency_ms: float) -> None:
+        bucket = math.floor(math.log2(latency_ms) * BUCKETS_PER_DOUBLING) if latency_ms > 0 else -1 << 31
+        self.buckets[bucket] += 1
+        self.count += 1
+        self.total += latency_ms
+        self.max = max(self.max, latency_ms)
+
+    def percentile(self, q: float) -> float:
+        rank = q * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return 0.0 if bucket == -1 << 31 else min(2 ** ((bucket + 1) / BUCKETS_PER_DOUBLING), self.max)
+        return self.max
+
+
+def is_error(status) -> bool:
+    if isinstance(status, int):
+        return status >= 400
+    return status not in ('ok', 'skipped')
+
+
+def read_events(paths: Iterable[str]) -> Iterable[dict]:
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def aggregate(events: Iterable[dict], stage: Optional[str] = None,
+              session: Optional[str] = None) -> dict[str, LatencyHistogram]:
+    stages: defaultdict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+    for event in events:
+        if stage and event.get('stage') != stage or session and event.get('session') != session:
+            continue
+        histogram = stages[event.get('stage', '?')]
+        if is_error(event.get('status')):
+            histogram.errors += 1
+        if 'latency_ms' in event:
+            histogram.add(event['latency_ms'])
+    return stages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Aggregate per-stage latency percentiles from event logs")
+    parser.add_argument("paths", nargs="+", help="Event log files (.jsonl)")
+    parser.add_argument("--stage", help="Only this stage")
+    parser.add_argument("--session", help="Only this session")
+    args = parser.parse_args()
+
+    stages = aggregate(read_events(args.paths), args.stage, args.session)
+    if not stages:
+        print("No matching events", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"{'stage':<16} {'count':>8} {'errors':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, histogram in sorted(stages.items()):
+        if histogram.count:
+            print(f"{name:<16} {histogram.count:>8} {histogram.errors:>7} {histogram.percentile(0.5):>9.1f} "
+                  f"{histogram.percentile(0.9):>9.1f} {histogram.percentile(0.99):>9.1f} {histogram.max:>9.1f}")
+        else:
+            print(f"{name:<16} {0:>8} {histogram.errors:>7} {'-':>9} {'-':>9} {'-':>9} {'-':>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,44 @@
+import re
 import sys
 from loguru import logger
 from bot.config import settings
 from datetime import date
 
+MARKUP_TAG = re.compile(r"</?[a-z][a-z-]*>|</>")
+
+
+def console_filter(record: dict) -> bool:
+    # Structured events go to their own sink, see bot/utils/event_log.py
+    return record["level"].name != "TRACE" and "event" not in record["extra"]
+
+
 logger.remove()
 
-logger.add(
-    sink=sys.stdout,
-    format="<light-white>{time:YYYY-MM-DD HH:mm:ss}</light-white>"
-           " | <level>{level: <8}</level>"
-           " | <light-white><b>{message}</b></light-white>",
-    filter=lambda record: record["level"].name != "TRACE",
-    colorize=True
-)
+if settings.LOG_FORMAT == "json":
+    logger.add(
+        sink=sys.stdout,
+        serialize=True,
+        filter=console_filter,
+        enqueue=True
+    )
+elif settings.LOG_FORMAT == "plain":
+    logger.add(
+        sink=sys.stdout,
+        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {message}",
+        filter=console_filter,
+        colorize=False,
+        enqueue=True
+    )
+else:
+    logger.add(
+        sink=sys.stdout,
+        format="<light-white>{time:YYYY-MM-DD HH:mm:ss}</light-white>"
+               " | <level>{level: <8}</level>"
+               " | <light-white><b>{message}</b></light-white>",
+        filter=console_filter,
+        colorize=True,
+        enqueue=True
+    )
 
 if settings.DEBUG_LOGGING:
     logger.add(
@@ -21,10 +47,20 @@ if settings.DEBUG_LOGGING:
         level="TRACE",
         backtrace=True,
         diagnose=True,
-        filter=lambda record: record["level"].name == "TRACE"
+        filter=lambda record: record["level"].name == "TRACE",
+        enqueue=True
     )
 
-logger = logger.opt(colors=True)
+
+def strip_markup(record: dict) -> None:
+    record["message"] = MARKUP_TAG.sub("", record["message"])
+
+
+# Colour markup is only parsed when a colourised sink will render it
+if settings.LOG_FORMAT in ("json", "plain"):
+    logger = logger.patch(strip_markup)
+else:
+    logger = logger.opt(colors=True)
 
 def log_error(text: str) -> None:
     if settings.DEBUG_LOGGING:
@@ -0,0 +1,268 @@
+"""Profiler that is switched on at runtime.
+
+Toggle it with SIGUSR1, or through the local endpoint when PROFILER_PORT is set:
+
+    curl 127.0.0.1:<port>/profile/start
+    curl 127.0.0.1:<port>/profile/stats
+    curl 127.0.0.1:<port>/profile/stacks > farm.folded
+    curl 127.0.0.1:<port>/profile/stop
+
+The same endpoint serves the watchdog's /metrics, see bot/utils/watchdog.py.
+
+While it runs it records wall time per `profiler.stage(...)` block, event-loop lag and
+stacks of the loop thread sampled every PROFILER_SAMPLE_INTERVAL. A callback still on
+the stack after PROFILER_SLOW_CALLBACK is reported as slow. This comes from the same
+samples: asyncio debug mode would capture a traceback per handle and distort the
+profile. The stacks are in folded format ("a;b;c count"), which flamegraph.pl and
+speedscope read. Stopping writes the stats and the stacks to logs/. While stopped,
+`stage()` returns a shared no-op context manager.
+"""
+import asyncio
+import json
+import os
+import signal
+import sys
+import threading
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+from time import monotonic, perf_counter, sleep, strftime
+from typing import Optional
+
+from bot.config import settings
+from bot.utils import logger
+from bot.utils.event_query import LatencyHistogram
+
+PROFILE_DIR = 'logs'
+LAG_INTERVAL = 0.1
+TOP_SLOW_CALLBACKS = 20
+_NOOP = nullcontext()
+
+
+class _Stage:
+    __slots__ = ('_histogram', '_started')
+
+    def __init__(self, histogram: LatencyHistogram):
+        self._histogram = histogram
+
+    def __enter__(self) -> None:
+        self._started = perf_counter()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._histogram.add((perf_counter() - self._started) * 1000)
+
+
+def frame_name(frame, line: bool = False) -> str:
+    code = frame.f_code
+    location = os.path.basename(code.co_filename)
+    return f"{code.co_qualname} ({location}:{frame.f_lineno})" if line else f"{code.co_qualname} ({location})"
+
+
+def thread_frames(thread_id: int) -> list:
+    """Current stack of another thread, outermost frame first."""
+    frames = []
+    frame = sys._current_frames().get(thread_id)
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+def running_callback(frames: list) -> Optional[tuple]:
+    """Returns the Handle._run frame and the callback's entry frame if the loop is running one."""
+    for index, frame in enumerate(frames[:-1]):
+        if frame.f_code.co_name == '_run' and frame.f_code.co_filename.endswith('events.py'):
+            entry = frames[index + 1:]
+            # A pure-Python Task steps through __step before reaching the coroutine
+            if entry[0].f_code.co_name == '__step' and len(entry) > 1:
+                return frame, entry[1]
+            return frame, entry[0]
+    return None
+
+
+def describe_callback(frames: list) -> Optional[str]:
+    callback = running_callback(frames)
+    if callback is None:
+        return None
+    return f"{frame_name(callback[1], True)} -> {frame_name(frames[-1], True)}"
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self._reset()
+        self._stacks_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._lag_task: Optional[asyncio.Task] = None
+
+    def _reset(self) -> None:
+        self.started_at = monotonic()
+        self.stages: defaultdict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.loop_lag = LatencyHistogram()
+        self.slow_callbacks: dict[str, list[float]] = {}
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+    def stage(self, name: str):
+        """Times the wrapped block under `name` while profiling is on."""
+        if not self.enabled:
+            return _NOOP
+        return _Stage(self.stages[name])
+
+    def add_slow_callback(self, callback: str, duration: float) -> None:
+        count, total, longest = self.slow_callbacks.get(callback, [0, 0, 0.0])
+        self.slow_callbacks[callback] = [count + 1, total + duration, max(longest, duration)]
+
+    def start(self) -> None:
+        if self.enabled:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._reset()
+        self.enabled = True
+        self._lag_task = self._loop.create_task(self._sample_lag())
+        self._sampler = threading.Thread(target=self._sample_stacks, name='profiler-sampler', daemon=True)
+        self._sampler.start()
+        logger.info("Profiler | Started")
+
+    def stop(self) -> Optional[str]:
+        """Stops profiling and writes the report; returns the report path."""
+        if not self.enabled:
+            return None
+        self.enabled = False
+        if self._lag_task:
+            self._lag_task.cancel()
+        if self._sampler:
+            self._sampler.join()
+        report_path = self.write_report()
+        logger.info(f"Profiler | Stopped, report written to {report_path}")
+        return report_path
+
+    def toggle(self) -> None:
+        if self.enabled:
+            self.stop()
+        else:
+            self.start()
+
+    async def _sample_lag(self) -> None:
+        while True:
+            expected = monotonic() + LAG_INTERVAL
+            await asyncio.sleep(LAG_INTERVAL)
+            self.loop_lag.add(max(monotonic() - expected, 0.0) * 1000)
+
+    def _sample_stacks(self) -> None:
+        interval = settings.PROFILER_SAMPLE_INTERVAL
+        # Identity, first and last sighting and description of the callback the loop is running
+        running: Optional[tuple] = None
+        while self.enabled:
+            now = monotonic()
+            frames = thread_frames(self._loop_thread_id)
+            callback = running_callback(frames)
+            current = (id(callback[0]), id(callback[1])) if callback else None
+            if current and running and running[0] == current:
+                running = (current, running[1], now, running[3])
+            else:
+                self._finish_callback(running, interval)
+                running = (current, now, now, describe_callback(frames)) if current else None
+
+            if frames:
+                with self._stacks_lock:
+                    self.stacks[';'.join(frame_name(frame) for frame in frames)] += 1
+                    self.samples += 1
+            sleep(interval)
+        self._finish_callback(running, interval)
+
+    def _finish_callback(self, running: Optional[tuple], interval: float) -> None:
+        if running:
+            _, first_seen, last_seen, description = running
+            duration = last_seen - first_seen + interval
+            if duration >= settings.PROFILER_SLOW_CALLBACK:
+                self.add_slow_callback(description, duration)
+
+    def folded_stacks(self) -> str:
+        with self._stacks_lock:
+            stacks = list(self.stacks.items())
+        return ''.join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def stats(self) -> dict:
+        def summary(histogram: LatencyHistogram) -> dict:
+            return {
+                'count': histogram.count,
+                'total_s': round(histogram.total / 1000, 3),
+                'p50_ms': round(histogram.percentile(0.5), 1),
+                'p99_ms': round(histogram.percentile(0.99), 1),
+                'max_ms': round(histogram.max, 1),
+            }
+
+        slowest = sorted(self.slow_callbacks.items(), key=lambda item: -item[1][1])[:TOP_SLOW_CALLBACKS]
+        return {
+            'enabled': self.enabled,
+            'duration_s': round(monotonic() - self.started_at, 1),
+            'stages': {name: summary(histogram) for name, histogram in sorted(self.stages.items())},
+            'loop_lag': summary(self.loop_lag),
+            'slow_callbacks': [
+                {'callback': callback, 'count': count, 'total_s': round(total, 3), 'max_s': round(longest, 3)}
+                for callback, (count, total, longest) in slowest
+            ],
+            'stack_samples': self.samples,
+        }
+
+    def write_report(self) -> str:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        base_path = os.path.join(PROFILE_DIR, f"profile_{strftime('%Y-%m-%d_%H-%M-%S')}")
+        with open(f"{base_path}.json", 'w') as file:
+            json.dump(self.stats(), file, indent=2)
+        with open(f"{base_path}.folded", 'w') as file:
+            file.write(self.folded_stacks())
+        return f"{base_path}.json"
+
+
+profiler = Profiler()
+
+
+def install_signal_toggle() -> bool:
+    """Toggles the profiler on SIGUSR1; returns False where the signal does not exist (Windows)."""
+    if not hasattr(signal, 'SIGUSR1'):
+        return False
+    asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, profiler.toggle)
+    return True
+
+
+async def run_control_server(port: int) -> None:
+    from aiohttp import web
+
+    async def start(request: web.Request) -> web.Response:
+        profiler.start()
+        return web.json_response({'enabled': True})
+
+    async def stop(request: web.Request) -> web.Response:
+        return web.json_response({'enabled': False, 'report': profiler.stop()})
+
+    async def stats(request: web.Request) -> web.Response:
+        return web.json_response(profiler.stats())
+
+    async def stacks(request: web.Request) -> web.Response:
+        return web.Response(text=profiler.folded_stacks())
+
+    async def metrics(request: web.Request) -> web.Response:
+        from bot.utils.watchdog import watchdog
+        return web.Response(text=watchdog.prometheus_text())
+
+    app = web.Application()
+    app.router.add_get('/profile/start', start)
+    app.router.add_get('/profile/stop', stop)
+    app.router.add_get('/profile/stats', stats)
+    app.router.add_get('/profile/stacks', stacks)
+    app.router.add_get('/metrics', metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, '127.0.0.1', port).start()
+        logger.info(f"Profiler | Control endpoint on http://127.0.0.1:{port}/profile/")
+        await asyncio.Event().wait()
+    finally:
+        if profiler.enabled:
+            profiler.stop()
+        await runner.cleanup()
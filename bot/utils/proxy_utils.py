@@ -1,13 +1,19 @@
 import os
+import asyncio
 import aiohttp
+import heapq
 from aiohttp_proxy import ProxyConnector
 from collections import Counter
+from dataclasses import dataclass
+from itertools import count
+from time import monotonic
+from typing import Iterable, Optional
 from python_socks import ProxyType
 from shutil import copyfile
 from better_proxy import Proxy
 from bot.config import settings
 from bot.utils import logger
-from random import shuffle
+from random import random, sample, shuffle
 
 PROXY_TYPES = {
     'socks5': ProxyType.SOCKS5,
@@ -16,6 +22,32 @@ PROXY_TYPES = {
     'https': ProxyType.HTTP
 }
 
+STATS_SMOOTHING = 0.3
+DEFAULT_PROXY_RTT = 1.0
+FAILURE_PENALTY = 4.0
+REBALANCE_GAIN = 1.5
+
+
+@dataclass
+class ProxyStats:
+    rtt: Optional[float] = None
+    failure_rate: float = 0.0
+    checks: int = 0
+    last_check: float = 0.0
+    alive: bool = False
+
+    def record(self, rtt: Optional[float]) -> None:
+        failed = rtt is None
+        self.alive = not failed
+        if not failed:
+            self.rtt = rtt if self.rtt is None else self.rtt + STATS_SMOOTHING * (rtt - self.rtt)
+        self.failure_rate += STATS_SMOOTHING * (float(failed) - self.failure_rate)
+        self.checks += 1
+        self.last_check = monotonic()
+
+
+proxy_stats: dict[str, ProxyStats] = {}
+
 
 def get_proxy_type(proxy_type: str) -> ProxyType:
     return PROXY_TYPES.get(proxy_type.lower())
@@ -41,40 +73,271 @@ def to_pyrogram_proxy(proxy: Proxy) -> dict:
     }
 
 
+class ProxyRegistry:
+    """In-memory view of a proxies file with a per-proxy session usage index.
+
+    The file is only re-read when its mtime changes, and rows that were already
+    parsed are reused so a reload only pays for new lines. Free proxies are also kept
+    in a heap by placement score. An entry is pushed again whenever a probe or a change
+    in usage changes the proxy's score, and superseded entries are skipped when popped.
+    """
+
+    def __init__(self, proxy_path: str):
+        self.proxy_path = proxy_path
+        self._mtime: Optional[int] = None
+        self._rows: dict[str, str] = {}
+        self._proxies: dict[str, None] = {}
+        self._usage: Counter = Counter()
+        self._assignments: dict[str, str] = {}
+        self._free: dict[str, None] = {}
+        self._synced_config: Optional[dict] = None
+        self._heap: list[tuple[float, float, int, str]] = []
+        self._heap_versions: dict[str, int] = {}
+        self._versions = count()
+
+    @property
+    def proxies(self) -> list[str]:
+        self.reload()
+        return list(self._proxies)
+
+    @property
+    def usage(self) -> Counter:
+        return self._usage
+
+    def reload(self) -> None:
+        if not os.path.isfile(self.proxy_path):
+            copyfile("bot/config/proxies-template.txt", self.proxy_path)
+        mtime = os.stat(self.proxy_path).st_mtime_ns
+        if mtime == self._mtime:
+            return
+
+        rows = {}
+        with open(file=self.proxy_path, encoding="utf-8-sig") as file:
+            for row in file:
+                row = row.strip()
+                if not row or row.startswith('type') or row in rows:
+                    continue
+                rows[row] = self._rows.get(row) or Proxy.from_str(proxy=row).as_url
+        self._rows = rows
+        self._proxies = dict.fromkeys(rows.values())
+        self._free = {proxy: None for proxy in self._proxies if self._has_capacity(proxy)}
+        self._rebuild_heap()
+        self._mtime = mtime
+
+    def sync_usage(self, accounts_config: dict) -> None:
+        if accounts_config is self._synced_config:
+            return
+        self._assignments = {name: cfg['proxy'] for name, cfg in accounts_config.items()
+                             if cfg.get('proxy') and cfg.get('active', True)}
+        self._usage = Counter(self._assignments.values())
+        self._free = {proxy: None for proxy in self._proxies if self._has_capacity(proxy)}
+        self._rebuild_heap()
+        self._synced_config = accounts_config
+
+    def assign(self, session_name: str, proxy: Optional[str]) -> None:
+        previous = self._assignments.pop(session_name, None)
+        if previous:
+            self._usage[previous] -= 1
+            self._update_free(previous)
+        if proxy:
+            self._assignments[session_name] = proxy
+            self._usage[proxy] += 1
+            self._update_free(proxy)
+
+    def unused(self) -> list[str]:
+        self.reload()
+        return list(self._free)
+
+    def best_free(self) -> Optional[str]:
+        """The free proxy with the lowest placement score, without taking it."""
+        self.reload()
+        self._drop_stale()
+        return self._heap[0][3] if self._heap else None
+
+    def pop_free(self) -> Optional[str]:
+        """Takes the best free proxy out of the heap until `restore()`, so concurrent callers try others."""
+        self.reload()
+        self._drop_stale()
+        if not self._heap:
+            return None
+        proxy = heapq.heappop(self._heap)[3]
+        del self._heap_versions[proxy]
+        return proxy
+
+    def restore(self, proxies: Iterable[str]) -> None:
+        for proxy in proxies:
+            if proxy in self._free:
+                self._push(proxy)
+
+    def rescore(self, proxy: str) -> None:
+        if proxy in self._heap_versions:
+            self._push(proxy)
+
+    def _push(self, proxy: str) -> None:
+        version = self._heap_versions[proxy] = next(self._versions)
+        # The random key spreads sessions over proxies with equal scores, e.g. the unmeasured ones
+        heapq.heappush(self._heap, (get_proxy_score(proxy, self._usage[proxy]), random(), version, proxy))
+        if len(self._heap) > 2 * len(self._heap_versions) + 64:
+            self._rebuild_heap()
+
+    def _rebuild_heap(self) -> None:
+        self._heap_versions = {proxy: next(self._versions) for proxy in self._free}
+        self._heap = [(get_proxy_score(proxy, self._usage[proxy]), random(), version, proxy)
+                      for proxy, version in self._heap_versions.items()]
+        heapq.heapify(self._heap)
+
+    def _drop_stale(self) -> None:
+        while self._heap and self._heap_versions.get(self._heap[0][3]) != self._heap[0][2]:
+            heapq.heappop(self._heap)
+
+    def _has_capacity(self, proxy: str) -> bool:
+        return self._usage[proxy] < settings.SESSIONS_PER_PROXY
+
+    def _update_free(self, proxy: str) -> None:
+        if proxy in self._proxies and self._has_capacity(proxy):
+            self._free[proxy] = None
+            self._push(proxy)
+        else:
+            self._free.pop(proxy, None)
+            self._heap_versions.pop(proxy, None)
+
+
+_registries: dict[str, ProxyRegistry] = {}
+
+
+def get_proxy_registry(proxy_path: str) -> ProxyRegistry:
+    if proxy_path not in _registries:
+        _registries[proxy_path] = ProxyRegistry(proxy_path)
+    return _registries[proxy_path]
+
+
 def get_proxies(proxy_path: str) -> list[str]:
-    proxy_template_path = "bot/config/proxies-template.txt"
+    registry = get_proxy_registry(proxy_path)
+    registry.reload()
+    return registry.proxies if settings.USE_PROXY else []
 
-    if not os.path.isfile(proxy_path):
-        copyfile(proxy_template_path, proxy_path)
-        return []
 
-    if settings.USE_PROXY:
-        with open(file=proxy_path, encoding="utf-8-sig") as file:
-            return list({Proxy.from_str(proxy=row.strip()).as_url for row in file if row.strip() and
-                         not row.strip().startswith('type')})
-    return []
+def get_proxy_score(proxy: str, load: int) -> float:
+    """Placement cost of adding a session to `proxy`, lower is better."""
+    stats = proxy_stats.get(proxy)
+    rtt = stats.rtt if stats and stats.rtt is not None else DEFAULT_PROXY_RTT
+    failure_rate = stats.failure_rate if stats else 0.0
+    capacity = max(settings.SESSIONS_PER_PROXY, 1)
+    return rtt * (1 + FAILURE_PENALTY * failure_rate) * (1 + load / capacity)
 
 
 def get_unused_proxies(accounts_config: dict, proxy_path: str) -> list[str]:
-    proxies_count = Counter([v.get('proxy') for v in accounts_config.values() if v.get('proxy')])
-    all_proxies = get_proxies(proxy_path)
-    return [proxy for proxy in all_proxies if proxies_count.get(proxy, 0) < settings.SESSIONS_PER_PROXY]
+    if not settings.USE_PROXY:
+        return []
+    registry = get_proxy_registry(proxy_path)
+    registry.sync_usage(accounts_config)
+    unused_proxies = registry.unused()
+    shuffle(unused_proxies)
+    return sorted(unused_proxies, key=lambda proxy: get_proxy_score(proxy, registry.usage[proxy]))
+
+
+def get_best_unused_proxy(accounts_config: dict, proxy_path: str) -> Optional[str]:
+    if not settings.USE_PROXY:
+        return None
+    registry = get_proxy_registry(proxy_path)
+    registry.sync_usage(accounts_config)
+    return registry.best_free()
+
+
+def is_measured(proxy: str) -> bool:
+    """True if `proxy` answered its last probe and that probe is recent."""
+    return get_proxy_liveness(proxy) is True and proxy_stats[proxy].rtt is not None
+
+
+def sample_free_proxies(accounts_config: dict, proxy_path: str, count: int) -> list[str]:
+    """Random free proxies for the prober, so the rebalancer has measured targets."""
+    registry = get_proxy_registry(proxy_path)
+    registry.sync_usage(accounts_config)
+    free_proxies = registry.unused()
+    return sample(free_proxies, min(count, len(free_proxies)))
+
+
+def plan_proxy_rebalance(accounts_config: dict, proxy_path: str, batch_size: int) -> dict[str, str]:
+    """Pick up to `batch_size` sessions sitting on slow or failing proxies and
+    map them to measurably better proxies that still have free capacity."""
+    registry = get_proxy_registry(proxy_path)
+    registry.sync_usage(accounts_config)
+    proxies_count = Counter(registry.usage)
+    candidates = [
+        (session_name, session_config['proxy']) for session_name, session_config in accounts_config.items()
+        if session_config.get('proxy') in proxy_stats and session_config.get('active', True)
+    ]
+    candidates.sort(key=lambda item: get_proxy_score(item[1], proxies_count[item[1]] - 1), reverse=True)
+    # An unmeasured proxy would score with the default RTT and no failures, i.e. better than most measured ones
+    free_proxies = [proxy for proxy in get_unused_proxies(accounts_config, proxy_path) if is_measured(proxy)]
+
+    moves = {}
+    for session_name, current_proxy in candidates:
+        if len(moves) >= batch_size or not free_proxies:
+            break
+        current_score = get_proxy_score(current_proxy, proxies_count[current_proxy] - 1)
+        best_proxy = min(free_proxies, key=lambda proxy: get_proxy_score(proxy, proxies_count[proxy]))
+        if get_proxy_score(best_proxy, proxies_count[best_proxy]) * REBALANCE_GAIN >= current_score:
+            continue
+        moves[session_name] = best_proxy
+        proxies_count[current_proxy] -= 1
+        proxies_count[best_proxy] += 1
+        if proxies_count[best_proxy] >= settings.SESSIONS_PER_PROXY:
+            free_proxies.remove(best_proxy)
+    return moves
 
 
-async def check_proxy(proxy: str) -> bool:
+async def check_proxy(proxy: str, verbose: bool = True) -> bool:
     url = 'https://ifconfig.me/ip'
     proxy_conn = ProxyConnector.from_url(proxy)
+    stats = proxy_stats.setdefault(proxy, ProxyStats())
+    start = monotonic()
     try:
         async with aiohttp.ClientSession(connector=proxy_conn, timeout=aiohttp.ClientTimeout(15)) as session:
             response = await session.get(url)
             if response.status == 200:
-                logger.success(f"Successfully connected to proxy. IP: {await response.text()}")
+                stats.record(monotonic() - start)
+                _rescore(proxy)
+                if verbose:
+                    logger.success(f"Successfully connected to proxy. IP: {await response.text()}")
                 if not proxy_conn.closed:
                     proxy_conn.close()
                 return True
     except Exception:
-        logger.warning(f"Proxy {proxy} didn't respond")
-        return False
+        if verbose:
+            logger.warning(f"Proxy {proxy} didn't respond")
+    stats.record(None)
+    _rescore(proxy)
+    return False
+
+
+def _rescore(proxy: str) -> None:
+    for registry in _registries.values():
+        registry.rescore(proxy)
+
+
+def get_proxy_liveness(proxy: str) -> Optional[bool]:
+    """Last probe result for `proxy`, or None if it was never probed or the result is stale."""
+    stats = proxy_stats.get(proxy)
+    if not stats or not stats.checks or monotonic() - stats.last_check > 2 * settings.PROXY_CHECK_INTERVAL:
+        return None
+    return stats.alive
+
+
+async def is_proxy_alive(proxy: str) -> bool:
+    alive = get_proxy_liveness(proxy)
+    return alive if alive is not None else await check_proxy(proxy)
+
+
+async def probe_proxies(proxies: list[str], concurrency: int) -> int:
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def probe(proxy: str) -> bool:
+        async with semaphore:
+            return await check_proxy(proxy, verbose=False)
+
+    results = await asyncio.gather(*(probe(proxy) for proxy in proxies))
+    return sum(results)
 
 
 async def get_proxy_chain(path: str) -> tuple[str | None, str | None]:
@@ -88,14 +351,21 @@ async def get_proxy_chain(path: str) -> tuple[str | None, str | None]:
 
 
 async def get_working_proxy(accounts_config: dict, current_proxy: str | None) -> str | None:
-    if current_proxy and await check_proxy(current_proxy):
+    if current_proxy and await is_proxy_alive(current_proxy):
         return current_proxy
 
     from bot.utils import PROXIES_PATH
-    unused_proxies = get_unused_proxies(accounts_config, PROXIES_PATH)
-    shuffle(unused_proxies)
-    for proxy in unused_proxies:
-        if await check_proxy(proxy):
-            return proxy
-
+    if not settings.USE_PROXY:
+        return None
+    registry = get_proxy_registry(PROXIES_PATH)
+    registry.sync_usage(accounts_config)
+    tried = []
+    try:
+        while (proxy := registry.pop_free()) is not None:
+            tried.append(proxy)
+            if await is_proxy_alive(proxy):
+                return proxy
+    finally:
+        # Still free until the caller assigns it; dead ones go back with the score of their failed probe
+        registry.restore(tried)
     return None
@@ -0,0 +1,50 @@
+import asyncio
+from math import inf
+from time import monotonic
+from typing import Awaitable, Callable, TypeVar
+
+from bot.exceptions import FloodWaitDeferred
+
+T = TypeVar('T')
+
+
+class FloodWaitScheduler:
+    """Keeps FloodWait deadlines per (session, method) and holds back calls until theirs has passed.
+
+    Calls wait outside of the session lock, so other methods of the same session
+    and other sessions keep running while one method is flood-limited.
+    """
+
+    def __init__(self):
+        self._deadlines: dict[tuple[str, str], float] = {}
+
+    def get_delay(self, session_name: str, method: str) -> float:
+        deadline = self._deadlines.get((session_name, method))
+        if deadline is None:
+            return 0.0
+        delay = deadline - monotonic()
+        if delay <= 0:
+            del self._deadlines[(session_name, method)]
+            return 0.0
+        return delay
+
+    def defer(self, session_name: str, method: str, seconds: float) -> None:
+        deadline = monotonic() + seconds
+        key = (session_name, method)
+        self._deadlines[key] = max(deadline, self._deadlines.get(key, 0.0))
+
+    async def run(self, session_name: str, method: str, call: Callable[[], Awaitable[T]],
+                  max_wait: float = inf) -> T:
+        while True:
+            delay = self.get_delay(session_name, method)
+            if delay > max_wait:
+                raise FloodWaitDeferred(int(delay))
+            if delay:
+                await asyncio.sleep(delay)
+            try:
+                return await call()
+            except FloodWaitDeferred as e:
+                self.defer(session_name, method, e.seconds)
+
+
+rpc_scheduler = FloodWaitScheduler()
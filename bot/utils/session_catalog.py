@@ -0,0 +1,73 @@
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+
+SESSION_SUFFIX = '.session'
+# Sub-directory of the sessions folder -> backend its files belong to; top-level files are detected on load
+SESSION_DIRS: dict[str, Optional[str]] = {'': None, 'telethon': 'telethon', 'pyrogram': 'pyrogram'}
+
+
+@dataclass(frozen=True)
+class SessionEntry:
+    name: str
+    path: str
+    backend: Optional[str]
+
+    @property
+    def file_path(self) -> str:
+        return f"{self.path}{SESSION_SUFFIX}"
+
+
+class SessionCatalog:
+    """Session files of a sessions folder, rescanned per directory only when its mtime changes."""
+
+    def __init__(self, sessions_path: str):
+        self.sessions_path = sessions_path
+        self._dirs: dict[str, tuple[int, list[SessionEntry]]] = {}
+
+    def _scan_dir(self, subdir: str, backend: Optional[str]) -> list[SessionEntry]:
+        directory = os.path.join(self.sessions_path, subdir) if subdir else self.sessions_path
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except FileNotFoundError:
+            self._dirs.pop(subdir, None)
+            return []
+
+        cached = self._dirs.get(subdir)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        entries = []
+        with os.scandir(directory) as iterator:
+            for item in iterator:
+                if item.name.endswith(SESSION_SUFFIX) and item.is_file():
+                    name = item.name[:-len(SESSION_SUFFIX)]
+                    entries.append(SessionEntry(name, os.path.join(directory, name), backend))
+        self._dirs[subdir] = (mtime, entries)
+        return entries
+
+    def entries(self) -> list[SessionEntry]:
+        entries = []
+        for subdir, backend in SESSION_DIRS.items():
+            entries += self._scan_dir(subdir, backend)
+        return sorted(entries, key=lambda entry: entry.path)
+
+    def paths(self) -> list[str]:
+        return [entry.path for entry in self.entries()]
+
+    def find(self, session_name: str) -> list[SessionEntry]:
+        return [entry for entry in self.entries() if entry.name == session_name]
+
+    def invalidate(self) -> None:
+        self._dirs.clear()
+
+
+_catalogs: dict[str, SessionCatalog] = {}
+
+
+def get_session_catalog(sessions_path: str) -> SessionCatalog:
+    catalog = _catalogs.get(sessions_path)
+    if catalog is None:
+        catalog = _catalogs[sessions_path] = SessionCatalog(sessions_path)
+    return catalog
@@ -0,0 +1,120 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from time import time
+from typing import Callable, Optional
+
+from bot.utils import logger, CONFIG_PATH
+from bot.utils.tg_cache import JsonCacheStore
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def inspect_session_file(path: str) -> Optional[str]:
+    """Returns the reason the session database is unusable, or None if it holds an auth key."""
+    try:
+        with closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as connection:
+            row = connection.execute("SELECT auth_key FROM sessions LIMIT 1").fetchone()
+    except sqlite3.Error as e:
+        return f"database error: {e}"
+    if not row or not row[0]:
+        return "auth key is missing"
+    return None
+
+
+class SessionIndex(JsonCacheStore):
+    """Preflight results per session, valid for as long as the session file keeps its mtime and hash."""
+
+    def lookup(self, session_name: str, stat: os.stat_result) -> Optional[dict]:
+        entry = self.data.get(session_name)
+        if entry and entry.get('mtime') == stat.st_mtime and entry.get('size') == stat.st_size:
+            return entry
+        return None
+
+    def is_invalid(self, session: str) -> bool:
+        try:
+            stat = os.stat(f"{session}.session")
+        except OSError:
+            return False
+        entry = self.lookup(os.path.basename(session), stat)
+        return bool(entry and entry['error'])
+
+
+session_index = SessionIndex(os.path.join(os.path.dirname(CONFIG_PATH), 'session_index.json'))
+
+
+def validate_session_file(path: str, stat: os.stat_result, entry: Optional[dict]) -> dict:
+    digest = file_digest(path)
+    if entry and entry.get('hash') == digest:
+        error = entry['error']
+    else:
+        error = inspect_session_file(path)
+    return {'mtime': stat.st_mtime, 'size': stat.st_size, 'hash': digest, 'error': error, 'checked_at': time()}
+
+
+async def _check_live(session_name: str, client_factory: Callable, semaphore: asyncio.Semaphore) -> Optional[str]:
+    async with semaphore:
+        tg_client = client_factory(session_name)
+        backend = tg_client.backend
+        try:
+            await backend.begin_batch()
+            await backend.get_me()
+        except (backend.unauthorized_errors + backend.banned_errors) as e:
+            return f"rejected by Telegram: {e}"
+        except Exception as e:
+            logger.warning(f"{session_name} | Live preflight check failed: {e}")
+        finally:
+            await backend.end_batch()
+            tg_client.release()
+    return None
+
+
+async def preflight_sessions(session_paths: list[str], workers: int,
+                             client_factory: Optional[Callable] = None) -> dict[str, dict]:
+    """Validates session files in a bounded thread pool, reusing index entries for unchanged files.
+
+    With `client_factory` every statically valid session is also asked for `get_me`;
+    network failures are only logged, while an authorization error marks the session invalid.
+    """
+    loop = asyncio.get_running_loop()
+    results: dict[str, dict] = {}
+    pending = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for session in session_paths:
+            session_name = os.path.basename(session)
+            path = f"{session}.session"
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                results[session_name] = {'error': f"unreadable: {e}"}
+                continue
+            entry = session_index.lookup(session_name, stat)
+            if entry:
+                results[session_name] = entry
+            else:
+                entry = session_index.data.get(session_name)
+                pending.append((session_name, loop.run_in_executor(executor, validate_session_file, path, stat, entry)))
+
+        for session_name, future in pending:
+            results[session_name] = session_index.data[session_name] = await future
+
+    if client_factory:
+        semaphore = asyncio.Semaphore(workers)
+        names = [name for name, entry in results.items() if not entry['error']]
+        errors = await asyncio.gather(*(_check_live(name, client_factory, semaphore) for name in names))
+        for session_name, error in zip(names, errors):
+            if error:
+                results[session_name]['error'] = error
+
+    if pending or client_factory:
+        await session_index.save(*(name for name in results if name in session_index.data))
+    return results
@@ -0,0 +1,38 @@
+import asyncio
+from time import monotonic
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one and keeps a truthy result for `ttl` seconds.
+
+    Callers share the result object, so they must treat it as read-only.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task] = {}
+        self._results: dict[Hashable, tuple[float, Any]] = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]], ttl: float = 0.0) -> Any:
+        cached = self._results.get(key)
+        if cached is not None:
+            if cached[0] > monotonic():
+                return cached[1]
+            del self._results[key]
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(call())
+            task.add_done_callback(lambda done: self._finish(key, done, ttl))
+        # A cancelled caller must not cancel the call the others are waiting for
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task, ttl: float) -> None:
+        self._calls.pop(key, None)
+        if ttl > 0 and not task.cancelled() and task.exception() is None and task.result():
+            self._evict_expired()
+            self._results[key] = (monotonic() + ttl, task.result())
+
+    def _evict_expired(self) -> None:
+        now = monotonic()
+        for key in [key for key, (expires, _) in self._results.items() if expires <= now]:
+            del self._results[key]
@@ -0,0 +1,180 @@
+from abc import ABC, abstractmethod
+from importlib import import_module
+from sqlite3 import OperationalError
+from types import SimpleNamespace
+from typing import Optional
+
+from better_proxy import Proxy
+
+
+class TelegramBackend(ABC):
+    """Library-specific half of UniversalTelegramClient.
+
+    A backend owns its client's connection lifecycle and exposes the raw operations
+    the shared client logic is built from. The error tuples let that logic catch
+    library exceptions without branching on the library.
+    """
+
+    name: str
+    flood_errors: tuple[type[Exception], ...] = ()
+    peer_invalid_errors: tuple[type[Exception], ...] = ()
+    unauthorized_errors: tuple[type[Exception], ...] = ()
+    banned_errors: tuple[type[Exception], ...] = ()
+    already_participant_errors: tuple[type[Exception], ...] = ()
+    # Errors that make the session file itself unusable
+    session_errors: tuple[type[Exception], ...] = ()
+
+    def __init__(self, client):
+        self.client = client
+        self.proxy: Optional[dict] = None
+        self._dc_id: Optional[int] = None
+        self._batch_depth = 0
+        self._owns_connection = False
+
+    @property
+    @abstractmethod
+    def session_name(self) -> str: ...
+
+    @property
+    @abstractmethod
+    def dc_id(self) -> int: ...
+
+    @abstractmethod
+    def is_connected(self) -> bool: ...
+
+    @abstractmethod
+    def has_proxy(self) -> bool: ...
+
+    @abstractmethod
+    def set_proxy(self, proxy: Proxy) -> None: ...
+
+    @abstractmethod
+    def flood_seconds(self, error: Exception) -> int: ...
+
+    def is_busy(self) -> bool:
+        return self._batch_depth > 0 or self.is_connected()
+
+    async def connect(self) -> None:
+        await self.client.connect()
+
+    async def disconnect(self) -> None:
+        await self.client.disconnect()
+
+    def close(self) -> None:
+        """Closes what the client keeps open while disconnected, e.g. the session database."""
+
+    async def get_me(self):
+        return await self.client.get_me()
+
+    async def begin_batch(self) -> None:
+        if self._batch_depth == 0 and not self.is_connected():
+            await self.connect()
+            self._owns_connection = True
+        self._batch_depth += 1
+
+    async def end_batch(self) -> bool:
+        """Leave a batch; returns True if this closed the connection opened by `begin_batch`."""
+        self._batch_depth = max(self._batch_depth - 1, 0)
+        if self._batch_depth or not self._owns_connection:
+            return False
+        self._owns_connection = False
+        if not self.is_connected():
+            return False
+        await self.disconnect()
+        return True
+
+    @abstractmethod
+    async def resolve_peer(self, peer_id): ...
+
+    @abstractmethod
+    def peer_from_cache(self, entry: dict): ...
+
+    @abstractmethod
+    def build_webview_data(self, peer, bot_shortname: str = None) -> dict: ...
+
+    @abstractmethod
+    async def request_app_webview(self, webview_data: dict, start_param: str) -> str: ...
+
+    @abstractmethod
+    async def has_start_message(self, bot_username: str) -> bool: ...
+
+    @abstractmethod
+    async def start_bot(self, webview_data: dict, start: dict) -> None: ...
+
+    @abstractmethod
+    async def request_webview(self, webview_data: dict, bot_url: str, start: dict) -> str: ...
+
+    @abstractmethod
+    async def get_dialogs(self, limit: int = 100, offset: Optional[tuple] = None): ...
+
+    @abstractmethod
+    def dialogs_offset(self, page) -> Optional[tuple]:
+        """(offset_date, offset_id, offset_peer) continuing after the last dialog of `page`."""
+
+    async def get_all_dialogs(self, page_size: int = 100) -> SimpleNamespace:
+        """Every dialog of the account, archived ones included, with the chats they refer to."""
+        chats, dialogs = [], []
+        offset = None
+        while True:
+            page = await self.get_dialogs(limit=page_size, offset=offset)
+            page_dialogs = getattr(page, 'dialogs', [])
+            chats.extend(getattr(page, 'chats', []))
+            dialogs.extend(page_dialogs)
+            if len(page_dialogs) < page_size:
+                break
+            next_offset = self.dialogs_offset(page)
+            if next_offset is None or next_offset == offset:
+                break
+            offset = next_offset
+        return SimpleNamespace(chats=chats, dialogs=dialogs)
+
+    @abstractmethod
+    async def import_chat_invite(self, invite_hash: str) -> tuple[object, str]: ...
+
+    @abstractmethod
+    async def join_channel(self, peer) -> None: ...
+
+    @abstractmethod
+    async def mute_peer(self, peer) -> None: ...
+
+    @abstractmethod
+    async def archive_peer(self, peer) -> None: ...
+
+    @abstractmethod
+    async def update_profile(self, **params) -> None: ...
+
+
+# Backend name -> (module, class); a library is imported only once a session needs its backend
+BACKEND_MODULES: dict[str, tuple[str, str]] = {
+    'telethon': ('bot.utils.tg_backends.telethon_backend', 'TelethonBackend'),
+    'pyrogram': ('bot.utils.tg_backends.pyrogram_backend', 'PyrogramBackend'),
+}
+BACKENDS: dict[str, type[TelegramBackend]] = {}
+
+
+def get_backend_class(name: str) -> type[TelegramBackend]:
+    backend = BACKENDS.get(name)
+    if backend is None:
+        module_name, class_name = BACKEND_MODULES[name]
+        backend = BACKENDS[name] = getattr(import_module(module_name), class_name)
+    return backend
+
+
+def session_errors(name: Optional[str] = None) -> tuple[type[Exception], ...]:
+    """Session errors of the backends loaded so far, or of backend `name` if it is loaded.
+
+    A library can only raise its errors once its backend was imported, so catching them
+    never has to import a library.
+    """
+    backends = [BACKENDS[name]] if name in BACKENDS else [] if name else list(BACKENDS.values())
+    return tuple(error for backend in backends for error in backend.session_errors)
+
+
+def create_backend(client_params: dict, name: Optional[str] = None) -> TelegramBackend:
+    if name:
+        return get_backend_class(name).create(client_params)
+    # Telethon fails to read a Pyrogram session database with OperationalError
+    try:
+        return get_backend_class('telethon').create(client_params)
+    except OperationalError:
+        return get_backend_class('pyrogram').create(client_params)
@@ -0,0 +1,158 @@
+import os
+import sqlite3
+from contextlib import closing
+from random import randint
+from typing import Optional
+
+from better_proxy import Proxy
+import pyrogram.errors as perrors
+import pyrogram.raw.functions.account as paccount
+import pyrogram.raw.functions.channels as pchannels
+import pyrogram.raw.functions.messages as pmessages
+import pyrogram.raw.functions.folders as pfolders
+from pyrogram import Client as PyrogramClient
+from pyrogram import utils as putils
+from pyrogram.raw import types as ptypes
+
+from bot.utils.proxy_utils import to_pyrogram_proxy
+from bot.utils.tg_backends import TelegramBackend
+
+
+class PyrogramBackend(TelegramBackend):
+    name = 'pyrogram'
+    flood_errors = (perrors.FloodWait,)
+    peer_invalid_errors = (perrors.PeerIdInvalid, perrors.ChannelInvalid)
+    unauthorized_errors = (perrors.Unauthorized, perrors.AuthKeyUnregistered)
+    banned_errors = (perrors.UserDeactivated, perrors.UserDeactivatedBan, perrors.PhoneNumberBanned)
+    already_participant_errors = (perrors.UserAlreadyParticipant,)
+    session_errors = (perrors.AuthKeyUnregistered, perrors.SessionPasswordNeeded, perrors.SessionRevoked)
+
+    @classmethod
+    def create(cls, client_params: dict) -> 'PyrogramBackend':
+        params = dict(client_params)
+        params['name'] = params.pop('session')
+        params.pop('system_lang_code', None)
+        client = PyrogramClient(**params)
+        client.no_updates = True
+        client.run = lambda *args, **kwargs: None
+        return cls(client)
+
+    @property
+    def session_name(self) -> str:
+        return os.path.splitext(os.path.basename(self.client.name))[0]
+
+    @property
+    def dc_id(self) -> int:
+        if self._dc_id is None:
+            try:
+                with closing(sqlite3.connect(self.client.storage.database)) as connection:
+                    row = connection.execute("SELECT dc_id FROM sessions LIMIT 1").fetchone()
+                self._dc_id = row[0] if row else 0
+            except (sqlite3.Error, AttributeError):
+                self._dc_id = 0
+        return self._dc_id
+
+    def is_connected(self) -> bool:
+        return bool(self.client.is_connected)
+
+    def has_proxy(self) -> bool:
+        return bool(self.client.proxy)
+
+    def set_proxy(self, proxy: Proxy) -> None:
+        self.proxy = to_pyrogram_proxy(proxy)
+        self.client.proxy = self.proxy
+
+    def flood_seconds(self, error: Exception) -> int:
+        return error.value
+
+    async def resolve_peer(self, peer_id):
+        return await self.client.resolve_peer(peer_id)
+
+    def peer_from_cache(self, entry: dict):
+        if entry['type'] == 'user':
+            return ptypes.InputPeerUser(user_id=entry['id'], access_hash=entry['access_hash'])
+        if entry['type'] == 'channel':
+            return ptypes.InputPeerChannel(channel_id=entry['id'], access_hash=entry['access_hash'])
+        return ptypes.InputPeerChat(chat_id=entry['id'])
+
+    def build_webview_data(self, peer, bot_shortname: str = None) -> dict:
+        if not bot_shortname:
+            return {'peer': peer, 'bot': peer}
+        return {'peer': peer, 'app': ptypes.InputBotAppShortName(bot_id=peer, short_name=bot_shortname)}
+
+    async def request_app_webview(self, webview_data: dict, start_param: str) -> str:
+        web_view = await self.client.invoke(pmessages.RequestAppWebView(
+            **webview_data,
+            platform='android',
+            write_allowed=True,
+            start_param=start_param
+        ))
+        return web_view.url
+
+    async def has_start_message(self, bot_username: str) -> bool:
+        async for message in self.client.get_chat_history(bot_username):
+            if message.text and r'/start' in message.text:
+                return True
+        return False
+
+    async def start_bot(self, webview_data: dict, start: dict) -> None:
+        await self.client.invoke(pmessages.StartBot(**webview_data, random_id=randint(1, 2**63), **start))
+
+    async def request_webview(self, webview_data: dict, bot_url: str, start: dict) -> str:
+        web_view = await self.client.invoke(pmessages.RequestWebView(
+            **webview_data,
+            platform='android',
+            from_bot_menu=False,
+            url=bot_url,
+            **start
+        ))
+        return web_view.url
+
+    async def get_dialogs(self, limit: int = 100, offset: Optional[tuple] = None):
+        offset_date, offset_id, offset_peer = offset or (0, 0, ptypes.InputPeerEmpty())
+        return await self.client.invoke(pmessages.GetDialogs(
+            offset_date=offset_date, offset_id=offset_id, offset_peer=offset_peer, limit=limit, hash=0))
+
+    def dialogs_offset(self, page) -> Optional[tuple]:
+        last = page.dialogs[-1]
+        peer_id = putils.get_peer_id(last.peer)
+        message = next((message for message in page.messages
+                        if message.id == last.top_message and putils.get_peer_id(message.peer_id) == peer_id), None)
+        if message is None:
+            return None
+        if isinstance(last.peer, ptypes.PeerUser):
+            user = next((user for user in page.users if user.id == last.peer.user_id), None)
+            offset_peer = user and ptypes.InputPeerUser(user_id=user.id, access_hash=user.access_hash)
+        elif isinstance(last.peer, ptypes.PeerChannel):
+            channel = next((chat for chat in page.chats if chat.id == last.peer.channel_id), None)
+            offset_peer = channel and ptypes.InputPeerChannel(channel_id=channel.id, access_hash=channel.access_hash)
+        else:
+            offset_peer = ptypes.InputPeerChat(chat_id=last.peer.chat_id)
+        return (message.date, message.id, offset_peer) if offset_peer else None
+
+    async def import_chat_invite(self, invite_hash: str) -> tuple[object, str]:
+        result = await self.client.invoke(pmessages.ImportChatInvite(hash=invite_hash))
+        chat = result.chats[0]
+        return ptypes.InputPeerChannel(channel_id=chat.id, access_hash=chat.access_hash), chat.title
+
+    async def join_channel(self, peer) -> None:
+        channel = ptypes.InputChannel(channel_id=peer.channel_id, access_hash=peer.access_hash)
+        await self.client.invoke(pchannels.JoinChannel(channel=channel))
+
+    async def mute_peer(self, peer) -> None:
+        await self.client.invoke(paccount.UpdateNotifySettings(
+            peer=ptypes.InputNotifyPeer(peer=peer),
+            settings=ptypes.InputPeerNotifySettings(
+                show_previews=False,
+                silent=True,
+                mute_until=2147483647
+            )
+        ))
+
+    async def archive_peer(self, peer) -> None:
+        await self.client.invoke(pfolders.EditPeerFolders(
+            folder_peers=[ptypes.InputFolderPeer(peer=peer, folder_id=1)]
+        ))
+
+    async def update_profile(self, **params) -> None:
+        await self.client.invoke(paccount.UpdateProfile(**params))
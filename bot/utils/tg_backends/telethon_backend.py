@@ -0,0 +1,142 @@
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from better_proxy import Proxy
+from opentele.tl import TelegramClient
+from telethon import errors as terrors, types as ttypes, utils as tutils
+from telethon.functions import messages, channels, account, folders
+from telethon.network import ConnectionTcpAbridged
+
+from bot.utils.proxy_utils import to_telethon_proxy
+from bot.utils.tg_backends import TelegramBackend
+
+
+class TelethonBackend(TelegramBackend):
+    name = 'telethon'
+    flood_errors = (terrors.FloodWaitError,)
+    peer_invalid_errors = (terrors.PeerIdInvalidError, terrors.ChannelInvalidError)
+    unauthorized_errors = (terrors.UnauthorizedError, terrors.AuthKeyUnregisteredError)
+    banned_errors = (terrors.UserDeactivatedError, terrors.UserDeactivatedBanError, terrors.PhoneNumberBannedError)
+    already_participant_errors = (terrors.UserAlreadyParticipantError,)
+    session_errors = (terrors.AuthKeyUnregisteredError, terrors.AuthKeyDuplicatedError, terrors.AuthKeyError,
+                      terrors.SessionPasswordNeededError)
+
+    @classmethod
+    def create(cls, client_params: dict) -> 'TelethonBackend':
+        client = TelegramClient(connection=ConnectionTcpAbridged, **client_params)
+        client.parse_mode = None
+        client.no_updates = True
+        return cls(client)
+
+    @property
+    def session_name(self) -> str:
+        return os.path.splitext(os.path.basename(self.client.session.filename))[0]
+
+    @property
+    def dc_id(self) -> int:
+        if self._dc_id is None:
+            self._dc_id = self.client.session.dc_id or 0
+        return self._dc_id
+
+    def is_connected(self) -> bool:
+        return self.client.is_connected()
+
+    def close(self) -> None:
+        # SQLiteSession opens its database on creation and only closes it on disconnect
+        self.client.session.close()
+
+    def has_proxy(self) -> bool:
+        return bool(self.client._proxy)
+
+    def set_proxy(self, proxy: Proxy) -> None:
+        self.proxy = to_telethon_proxy(proxy)
+        self.client.set_proxy(self.proxy)
+
+    def flood_seconds(self, error: Exception) -> int:
+        return error.seconds
+
+    async def resolve_peer(self, peer_id):
+        return await self.client.get_input_entity(peer_id)
+
+    def peer_from_cache(self, entry: dict):
+        if entry['type'] == 'user':
+            return ttypes.InputPeerUser(user_id=entry['id'], access_hash=entry['access_hash'])
+        if entry['type'] == 'channel':
+            return ttypes.InputPeerChannel(channel_id=entry['id'], access_hash=entry['access_hash'])
+        return ttypes.InputPeerChat(chat_id=entry['id'])
+
+    def build_webview_data(self, peer, bot_shortname: str = None) -> dict:
+        if not bot_shortname:
+            return {'peer': peer, 'bot': peer}
+        bot_id = ttypes.InputUser(user_id=peer.user_id, access_hash=peer.access_hash)
+        return {'peer': peer, 'app': ttypes.InputBotAppShortName(bot_id=bot_id, short_name=bot_shortname)}
+
+    async def request_app_webview(self, webview_data: dict, start_param: str) -> str:
+        web_view = await self.client(messages.RequestAppWebViewRequest(
+            **webview_data,
+            platform='android',
+            write_allowed=True,
+            start_param=start_param
+        ))
+        return web_view.url
+
+    async def has_start_message(self, bot_username: str) -> bool:
+        async for message in self.client.iter_messages(bot_username):
+            if message.text and r'/start' in message.text:
+                return True
+        return False
+
+    async def start_bot(self, webview_data: dict, start: dict) -> None:
+        await self.client(messages.StartBotRequest(**webview_data, **start))
+
+    async def request_webview(self, webview_data: dict, bot_url: str, start: dict) -> str:
+        web_view = await self.client(messages.RequestWebViewRequest(
+            **webview_data,
+            platform='android',
+            from_bot_menu=False,
+            url=bot_url,
+            **start
+        ))
+        return web_view.url
+
+    async def get_dialogs(self, limit: int = 100, offset: Optional[tuple] = None):
+        offset_date, offset_id, offset_peer = offset or (None, 0, ttypes.InputPeerEmpty())
+        return await self.client(messages.GetDialogsRequest(
+            offset_date=offset_date, offset_id=offset_id, offset_peer=offset_peer, limit=limit, hash=0))
+
+    def dialogs_offset(self, page) -> Optional[tuple]:
+        last = page.dialogs[-1]
+        peer_id = tutils.get_peer_id(last.peer)
+        entity = next((entity for entity in page.users + page.chats if tutils.get_peer_id(entity) == peer_id), None)
+        message = next((message for message in page.messages
+                        if message.id == last.top_message and tutils.get_peer_id(message.peer_id) == peer_id), None)
+        if entity is None or message is None:
+            return None
+        return message.date, message.id, tutils.get_input_peer(entity)
+
+    async def import_chat_invite(self, invite_hash: str) -> tuple[object, str]:
+        result = await self.client(messages.ImportChatInviteRequest(hash=invite_hash))
+        chat = result.chats[0]
+        return tutils.get_input_peer(chat), chat.title
+
+    async def join_channel(self, peer) -> None:
+        await self.client(channels.JoinChannelRequest(channel=peer))
+
+    async def mute_peer(self, peer) -> None:
+        await self.client(account.UpdateNotifySettingsRequest(
+            peer=ttypes.InputNotifyPeer(peer),
+            settings=ttypes.InputPeerNotifySettings(
+                show_previews=False,
+                silent=True,
+                mute_until=datetime.today() + timedelta(days=365)
+            )
+        ))
+
+    async def archive_peer(self, peer) -> None:
+        await self.client(folders.EditPeerFoldersRequest(
+            folder_peers=[ttypes.InputFolderPeer(peer=peer, folder_id=1)]
+        ))
+
+    async def update_profile(self, **params) -> None:
+        await self.client(account.UpdateProfileRequest(**params))
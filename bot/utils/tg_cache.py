@@ -0,0 +1,158 @@
+import asyncio
+import json
+import os
+from copy import deepcopy
+from time import time
+from typing import Optional
+
+from bot.utils import logger, AsyncInterProcessLock, CONFIG_PATH
+
+
+class JsonCacheStore:
+    """Per-account JSON cache shared by all sessions of the process and kept on disk between runs.
+
+    `save()` only marks entries as changed; they are written together after `save_delay`.
+    A write re-reads the file under the inter-process lock and replaces just the changed
+    entries, so entries saved by other processes in the meantime are kept.
+    """
+
+    save_delay = 1.0
+
+    def __init__(self, cache_path: str):
+        self.cache_path = cache_path
+        self._data: Optional[dict[str, dict]] = None
+        self._dirty: set[str] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = AsyncInterProcessLock(
+            os.path.join(os.path.dirname(cache_path), 'lock_files', f"{os.path.basename(cache_path)}.lock"))
+        _stores.append(self)
+
+    @property
+    def data(self) -> dict[str, dict]:
+        if self._data is None:
+            try:
+                with open(self.cache_path, 'r') as file:
+                    self._data = json.load(file)
+            except FileNotFoundError:
+                self._data = {}
+            except (OSError, ValueError) as e:
+                logger.warning(f"Failed to read cache `{self.cache_path}`: {e}. Starting with an empty one")
+                self._data = {}
+        return self._data
+
+    def account(self, session_name: str) -> dict:
+        return self.data.setdefault(session_name, {})
+
+    def reload(self) -> None:
+        """Drops the in-memory copy, so the next access reads what other processes have written."""
+        self._data = None
+
+    async def save(self, *keys: str) -> None:
+        """Schedules a write of `keys`; a key that is no longer in `data` is removed from the file."""
+        self._dirty.update(keys)
+        task = self._flush_task
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.save_delay)
+        await self.flush()
+
+    def mark_dirty(self, *keys: str) -> None:
+        """Includes `keys` in the next write without scheduling one."""
+        self._dirty.update(keys)
+
+    async def flush(self) -> None:
+        if not self._dirty:
+            return
+        keys, self._dirty = self._dirty, set()
+        # Copied here because the entries keep changing on the loop while the worker thread serializes them
+        updates = {key: deepcopy(self.data[key]) for key in keys if key in self.data}
+        try:
+            async with self._lock:
+                await asyncio.to_thread(self._merge_and_write, updates, keys - updates.keys())
+        except Exception as e:
+            self._dirty |= keys
+            logger.warning(f"Failed to save cache `{self.cache_path}`: {e}")
+
+    def save_sync(self, *keys: str) -> None:
+        """Writes `keys` right away, for callers without an event loop such as the web panel."""
+        updates = {key: self.data[key] for key in keys if key in self.data}
+        with self._lock:
+            self._merge_and_write(updates, set(keys) - updates.keys())
+
+    def _merge_and_write(self, updates: dict[str, dict], removed: set[str]) -> None:
+        try:
+            with open(self.cache_path, 'r') as file:
+                stored = json.load(file)
+        except FileNotFoundError:
+            stored = {}
+        except ValueError as e:
+            logger.warning(f"Cache `{self.cache_path}` is corrupted ({e}), rewriting it")
+            stored = {}
+        stored.update(updates)
+        for key in removed:
+            stored.pop(key, None)
+        self._write(json.dumps(stored, separators=(',', ':')))
+
+    def _write(self, content: str) -> None:
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'w') as file:
+            file.write(content)
+        os.replace(tmp_path, self.cache_path)
+
+
+_stores: list[JsonCacheStore] = []
+
+
+async def flush_all() -> None:
+    """Writes the pending changes of every cache store, e.g. before shutdown."""
+    await asyncio.gather(*(store.flush() for store in _stores))
+
+
+class PeerCache(JsonCacheStore):
+    """Resolved input peers (type, id, access_hash) by username for every account."""
+
+    @staticmethod
+    def _key(username: str) -> str:
+        return username.lstrip('@').lower()
+
+    def get(self, session_name: str, username: str) -> Optional[dict]:
+        return self.account(session_name).get(self._key(username))
+
+    async def set(self, session_name: str, username: str, peer_type: str, peer_id: int,
+                  access_hash: Optional[int] = None) -> None:
+        entry = {'type': peer_type, 'id': peer_id, 'access_hash': access_hash}
+        peers = self.account(session_name)
+        if peers.get(self._key(username)) != entry:
+            peers[self._key(username)] = entry
+            await self.save(session_name)
+
+    async def invalidate(self, session_name: str, username: str) -> None:
+        if self.account(session_name).pop(self._key(username), None) is not None:
+            await self.save(session_name)
+
+
+class MembershipCache(JsonCacheStore):
+    """Joined/muted state of public channels per account, refreshed in bulk from the dialog list."""
+
+    ttl = 12 * 3600
+
+    def is_fresh(self, session_name: str) -> bool:
+        return time() - self.account(session_name).get('refreshed_at', 0) < self.ttl
+
+    def get(self, session_name: str, channel: str) -> Optional[dict]:
+        return self.account(session_name).get('channels', {}).get(channel.lower())
+
+    async def replace(self, session_name: str, channels: dict[str, dict]) -> None:
+        self.data[session_name] = {'refreshed_at': time(), 'channels': channels}
+        await self.save(session_name)
+
+    def set(self, session_name: str, channel: str, joined: bool, muted: bool) -> None:
+        """Records a single join; it is written with the account's next refresh or the shutdown flush."""
+        self.account(session_name).setdefault('channels', {})[channel.lower()] = {'joined': joined, 'muted': muted}
+        self.mark_dirty(session_name)
+
+
+peer_cache = PeerCache(os.path.join(os.path.dirname(CONFIG_PATH), 'peer_cache.json'))
+membership_cache = MembershipCache(os.path.join(os.path.dirname(CONFIG_PATH), 'membership_cache.json'))
@@ -1,41 +1,73 @@
 import asyncio
 import os
 from better_proxy import Proxy
-from datetime import datetime, timedelta
+from datetime import datetime
+from enum import Enum
 from random import randint, uniform
-from sqlite3 import OperationalError
-from typing import Union
-
-from opentele.tl import TelegramClient
-from telethon.errors import *
-from telethon.functions import messages, channels, account, folders
-from telethon.network import ConnectionTcpAbridged
-from telethon.types import InputBotAppShortName, InputPeerNotifySettings, InputNotifyPeer, InputUser
-from telethon import types as raw
-
-import pyrogram.raw.functions.account as paccount
-import pyrogram.raw.functions.channels as pchannels
-import pyrogram.raw.functions.messages as pmessages
-import pyrogram.raw.functions.folders as pfolders
-from pyrogram import Client as PyrogramClient
-from pyrogram.errors import *
-from pyrogram.raw import types as ptypes
+from time import time
+from typing import Optional, Union
 
 from bot.config import settings
-from bot.exceptions import InvalidSession
-from bot.utils.proxy_utils import to_pyrogram_proxy, to_telethon_proxy
+from bot.exceptions import InvalidSession, FloodWaitDeferred
+from bot.utils.rpc_scheduler import rpc_scheduler
+from bot.utils.tg_backends import TelegramBackend, create_backend
+from bot.utils.tg_cache import peer_cache, membership_cache
 from bot.utils import logger, log_error, AsyncInterProcessLock, CONFIG_PATH, first_run
 
 
+MAX_QUEUED_FLOOD_WAIT = 300
+
+
+class JoinResult(Enum):
+    JOINED = 'joined'
+    ALREADY_JOINED = 'already_joined'
+    SKIPPED = 'skipped'
+    POSTPONED = 'postponed'
+    FAILED = 'failed'
+
+    @property
+    def succeeded(self) -> bool:
+        return self in (JoinResult.JOINED, JoinResult.ALREADY_JOINED, JoinResult.SKIPPED)
+
+
+def _peer_cache_entry(peer) -> tuple[str, int, Union[int, None]]:
+    if hasattr(peer, 'user_id'):
+        return 'user', peer.user_id, peer.access_hash
+    if hasattr(peer, 'channel_id'):
+        return 'channel', peer.channel_id, peer.access_hash
+    return 'chat', peer.chat_id, None
+
+
+def _memberships_from_dialogs(dialogs) -> dict[str, dict]:
+    usernames = {chat.id: chat.username.lower() for chat in dialogs.chats if getattr(chat, 'username', None)}
+    now = time()
+    memberships = {}
+    for dialog in dialogs.dialogs:
+        channel_id = getattr(dialog.peer, 'channel_id', None)
+        if channel_id not in usernames:
+            continue
+        mute_until = getattr(dialog.notify_settings, 'mute_until', None)
+        if isinstance(mute_until, datetime):
+            mute_until = mute_until.timestamp()
+        memberships[usernames[channel_id]] = {'joined': True, 'muted': bool(mute_until and mute_until > now)}
+    return memberships
+
+
 class UniversalTelegramClient:
-    def __init__(self, **client_params):
-        self.session_name = None
-        self.client: Union[TelegramClient, PyrogramClient]
-        self.proxy = None
+    def __init__(self, backend_name: Optional[str] = None, backend: Optional[TelegramBackend] = None,
+                 **client_params):
+        # An injected backend (e.g. a test double) is used as is and never released
+        if backend:
+            self.session_name = backend.session_name
+        else:
+            self.session_name = os.path.splitext(os.path.basename(client_params['session']))[0]
         self.is_first_run = True
-        self.is_pyrogram: bool = False
+        self._backend: Optional[TelegramBackend] = backend
+        self._backend_injected = backend is not None
+        self._dc_id: Optional[int] = None
+        self._proxy: Optional[Proxy] = None
         self._client_params = client_params
-        self._init_client()
+        self._backend_name = backend_name
         self.default_val = '252453226'
         self.lock = AsyncInterProcessLock(
             os.path.join(os.path.dirname(CONFIG_PATH), 'lock_files', f"{self.session_name}.lock"))
@@ -43,192 +75,141 @@ class UniversalTelegramClient:
         self.ref_id = settings.REF_ID if randint(1, 100) <= 70 else '252453226'
 
     def _init_client(self):
-        try:
-            self.client = TelegramClient(connection=ConnectionTcpAbridged, **self._client_params)
-            self.client.parse_mode = None
-            self.client.no_updates = True
-            self.is_pyrogram = False
-            self.session_name, _ = os.path.splitext(os.path.basename(self.client.session.filename))
-        except OperationalError:
-            session_name = self._client_params.pop('session')
-            self._client_params.pop('system_lang_code')
-            self._client_params['name'] = session_name
-            self.client = PyrogramClient(**self._client_params)
-            
-            self.client.no_updates = True
-            self.client.run = lambda *args, **kwargs: None
-            
-            self.is_pyrogram = True
-            self.session_name, _ = os.path.splitext(os.path.basename(self.client.name))
+        # Built on first use so that idle sessions don't hold an open session database
+        self._backend = create_backend(self._client_params, self._backend_name)
+        if self._proxy:
+            self._backend.set_proxy(self._proxy)
+
+    @property
+    def backend(self) -> TelegramBackend:
+        if self._backend is None:
+            self._init_client()
+        return self._backend
+
+    @property
+    def client(self):
+        return self.backend.client
+
+    @property
+    def is_pyrogram(self) -> bool:
+        return self.backend.name == 'pyrogram'
+
+    @property
+    def proxy(self) -> Optional[dict]:
+        return self._backend.proxy if self._backend else None
+
+    @property
+    def dc_id(self) -> int:
+        # Kept after `release()`, so asking for it does not rebuild an idle client
+        if self._dc_id is None:
+            self._dc_id = self.backend.dc_id
+        return self._dc_id
 
     def set_proxy(self, proxy: Proxy):
-        if not self.is_pyrogram:
-            self.proxy = to_telethon_proxy(proxy)
-            self.client.set_proxy(self.proxy)
-        else:
-            self.proxy = to_pyrogram_proxy(proxy)
-            self.client.proxy = self.proxy
+        self._proxy = proxy
+        if self._backend:
+            self._backend.set_proxy(proxy)
+
+    def release(self) -> bool:
+        """Close and drop the underlying client if it is idle; it is rebuilt on the next call."""
+        if self._backend is None or self._backend_injected or self._backend.is_busy():
+            return False
+        backend, self._backend = self._backend, None
+        try:
+            backend.close()
+        except Exception as e:
+            logger.warning(f"<ly>{self.session_name}</ly> | Failed to close the session storage: {e}")
+        return True
+
+    async def _sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
 
     async def get_app_webview_url(self, bot_username: str, bot_shortname: str, default_val: str) -> str:
         self.is_first_run = await first_run.check_is_first_run(self.session_name)
-        return await self._pyrogram_get_app_webview_url(bot_username, bot_shortname, default_val) if self.is_pyrogram \
-            else await self._telethon_get_app_webview_url(bot_username, bot_shortname, default_val)
+        return await rpc_scheduler.run(self.session_name, 'webview',
+                                       lambda: self._get_app_webview_url(bot_username, bot_shortname, default_val))
 
     async def get_webview_url(self, bot_username: str, bot_url: str, default_val: str) -> str:
         self.is_first_run = await first_run.check_is_first_run(self.session_name)
-        return await self._pyrogram_get_webview_url(bot_username, bot_url, default_val) if self.is_pyrogram \
-            else await self._telethon_get_webview_url(bot_username, bot_url, default_val)
+        return await rpc_scheduler.run(self.session_name, 'webview',
+                                       lambda: self._get_webview_url(bot_username, bot_url, default_val))
 
-    async def join_and_mute_tg_channel(self, link: str):
-        return await self._pyrogram_join_and_mute_tg_channel(link) if self.is_pyrogram \
-            else await self._telethon_join_and_mute_tg_channel(link)
+    async def join_and_mute_tg_channel(self, link: str) -> JoinResult:
+        path = link.replace("https://t.me/", "")
+        if self._is_subscribed(path):
+            logger.info(f"<ly>{self.session_name}</ly> | Already subscribed to channel: <y>{path}</y>")
+            return JoinResult.ALREADY_JOINED
+        try:
+            return await rpc_scheduler.run(self.session_name, 'join_channel',
+                                           lambda: self._join_and_mute_tg_channel(link),
+                                           max_wait=MAX_QUEUED_FLOOD_WAIT)
+        except FloodWaitDeferred as e:
+            logger.warning(f"<ly>{self.session_name}</ly> | Subscription to {link} postponed, FloodWait {e.seconds}s")
+            return JoinResult.POSTPONED
 
     async def update_profile(self, first_name: str = None, last_name: str = None, about: str = None):
-        return await self._pyrogram_update_profile(first_name=first_name, last_name=last_name, about=about) if self.is_pyrogram \
-            else await self._telethon_update_profile(first_name=first_name, last_name=last_name, about=about)
-
-    async def _telethon_initialize_webview_data(self, bot_username: str, bot_shortname: str = None):
-        if not self._webview_data:
-            while True:
-                try:
-                    peer = await self.client.get_input_entity(bot_username)
-                    bot_id = InputUser(user_id=peer.user_id, access_hash=peer.access_hash)
-                    input_bot_app = InputBotAppShortName(bot_id=bot_id, short_name=bot_shortname)
-                    self._webview_data = {'peer': peer, 'app': input_bot_app} if bot_shortname \
-                        else {'peer': peer, 'bot': peer}
-                    return
-                except FloodWaitError as fl:
-                    logger.warning(f"<ly>{self.session_name}</ly> | FloodWait {fl}. Waiting {fl.seconds}s")
-                    await asyncio.sleep(fl.seconds + 3)
-
-    async def _telethon_get_app_webview_url(self, bot_username: str, bot_shortname: str, default_val: str) -> str:
-        if self.proxy and not self.client._proxy:
-            logger.critical(f"<ly>{self.session_name}</ly> | Proxy found, but not passed to TelegramClient")
+        try:
+            return await rpc_scheduler.run(
+                self.session_name, 'update_profile',
+                lambda: self._update_profile(first_name=first_name, last_name=last_name, about=about),
+                max_wait=MAX_QUEUED_FLOOD_WAIT)
+        except FloodWaitDeferred as e:
+            logger.warning(f"<ly>{self.session_name}</ly> | Profile update postponed, FloodWait {e.seconds}s")
+
+    def _check_proxy_passed(self) -> None:
+        if self._proxy and not self.backend.has_proxy():
+            logger.critical(f"<ly>{self.session_name}</ly> | Proxy found, but not passed to {self.backend.name} client")
             exit(-1)
 
-        async with self.lock:
-            try:
-                if not self.client.is_connected():
-                    await self.client.connect()
-                await self._telethon_initialize_webview_data(bot_username=bot_username, bot_shortname=bot_shortname)
-                await asyncio.sleep(uniform(1, 2))
-
-                ref_id = default_val
-                start = {'start_param': ref_id}
-
-                web_view = await self.client(messages.RequestAppWebViewRequest(
-                    **self._webview_data,
-                    platform='android',
-                    write_allowed=True,
-                    **start
-                ))
+    async def _end_batch(self) -> None:
+        if await self.backend.end_batch():
+            await self._sleep(uniform(15, 20))
 
-                url = web_view.url
-                
-                if 'tgWebAppStartParam=' not in url:
-                    separator = '?' if '#' in url else '&#'
-                    insert_pos = url.find('#') if '#' in url else len(url)
-                    url = f"{url[:insert_pos]}{separator}tgWebAppStartParam={ref_id}{url[insert_pos:]}"
-
-                return url
-
-            except (UnauthorizedError, AuthKeyUnregisteredError):
-                raise InvalidSession(f"{self.session_name}: User is unauthorized")
-            except (UserDeactivatedError, UserDeactivatedBanError, PhoneNumberBannedError):
-                raise InvalidSession(f"{self.session_name}: User is banned")
+    async def _resolve_peer(self, username: str):
+        entry = peer_cache.get(self.session_name, username)
+        if entry:
+            return self.backend.peer_from_cache(entry)
+        peer = await self.backend.resolve_peer(username)
+        await peer_cache.set(self.session_name, username, *_peer_cache_entry(peer))
+        return peer
 
-            except Exception:
-                raise
+    async def _invalidate_peer(self, username: str) -> None:
+        await peer_cache.invalidate(self.session_name, username)
 
-            finally:
-                if self.client.is_connected():
-                    await self.client.disconnect()
-                    await asyncio.sleep(15)
+    def _is_subscribed(self, path: str) -> bool:
+        if path.startswith('+') or not membership_cache.is_fresh(self.session_name):
+            return False
+        membership = membership_cache.get(self.session_name, path)
+        return bool(membership and membership['joined'] and membership['muted'])
 
-    async def _telethon_get_webview_url(self, bot_username: str, bot_url: str, default_val: str) -> str:
-        if self.proxy and not self.client._proxy:
-            logger.critical(f"<ly>{self.session_name}</ly> | Proxy found, but not passed to TelegramClient")
-            exit(-1)
+    async def _get_membership(self, path: str) -> Optional[dict]:
+        if not membership_cache.is_fresh(self.session_name):
+            dialogs = await self.backend.get_all_dialogs()
+            await membership_cache.replace(self.session_name, _memberships_from_dialogs(dialogs))
+        return membership_cache.get(self.session_name, path)
 
-        async with self.lock:
+    async def _initialize_webview_data(self, bot_username: str, bot_shortname: str = None):
+        if not self._webview_data:
             try:
-                if not self.client.is_connected():
-                    await self.client.connect()
-                await self._telethon_initialize_webview_data(bot_username=bot_username)
-                await asyncio.sleep(uniform(1, 2))
-
-                start = {'start_param': self.get_ref_id()} if self.is_first_run else {}
-
-                start_state = False
-                async for message in self.client.iter_messages(bot_username):
-                    if r'/start' in message.text:
-                        start_state = True
-                        break
-                await asyncio.sleep(uniform(0.5, 1))
-                if not start_state:
-                    await self.client(messages.StartBotRequest(**self._webview_data, **start))
-                await asyncio.sleep(uniform(1, 2))
-
-                web_view = await self.client(messages.RequestWebViewRequest(
-                    **self._webview_data,
-                    platform='android',
-                    from_bot_menu=False,
-                    url=bot_url,
-                    **start
-                ))
-
-                return web_view.url
-
-            except (UnauthorizedError, AuthKeyUnregisteredError):
-                raise InvalidSession(f"{self.session_name}: User is unauthorized")
-            except (UserDeactivatedError, UserDeactivatedBanError, PhoneNumberBannedError):
-                raise InvalidSession(f"{self.session_name}: User is banned")
-
-            except Exception:
-                raise
-
-            finally:
-                if self.client.is_connected():
-                    await self.client.disconnect()
-                    await asyncio.sleep(15)
+                peer = await self._resolve_peer(bot_username)
+                self._webview_data = self.backend.build_webview_data(peer, bot_shortname)
+            except self.backend.flood_errors as fl:
+                seconds = self.backend.flood_seconds(fl)
+                logger.warning(f"<ly>{self.session_name}</ly> | FloodWait {fl}. Waiting {seconds}s")
+                raise FloodWaitDeferred(seconds + 3)
 
-    async def _pyrogram_initialize_webview_data(self, bot_username: str, bot_shortname: str = None):
-        if not self._webview_data:
-            while True:
-                try:
-                    peer = await self.client.resolve_peer(bot_username)
-                    input_bot_app = ptypes.InputBotAppShortName(bot_id=peer, short_name=bot_shortname)
-                    self._webview_data = {'peer': peer, 'app': input_bot_app} if bot_shortname \
-                        else {'peer': peer, 'bot': peer}
-                    return
-                except FloodWait as fl:
-                    logger.warning(f"<ly>{self.session_name}</ly> | FloodWait {fl}. Waiting {fl.value}s")
-                    await asyncio.sleep(fl.value + 3)
-
-    async def _pyrogram_get_app_webview_url(self, bot_username: str, bot_shortname: str, default_val: str) -> str:
-        if self.proxy and not self.client.proxy:
-            logger.critical(f"<ly>{self.session_name}</ly> | Proxy found, but not passed to Client")
-            exit(-1)
+    async def _get_app_webview_url(self, bot_username: str, bot_shortname: str, default_val: str) -> str:
+        self._check_proxy_passed()
 
         async with self.lock:
+            await self.backend.begin_batch()
             try:
-                if not self.client.is_connected:
-                    await self.client.connect()
-                await self._pyrogram_initialize_webview_data(bot_username, bot_shortname)
-                await asyncio.sleep(uniform(1, 2))
+                await self._initialize_webview_data(bot_username, bot_shortname)
+                await self._sleep(uniform(1, 2))
 
                 ref_id = default_val
-                start = {'start_param': ref_id}
-                
-                web_view = await self.client.invoke(pmessages.RequestAppWebView(
-                    **self._webview_data,
-                    platform='android',
-                    write_allowed=True,
-                    **start
-                ))
-
-                url = web_view.url
-                
+                url = await self.backend.request_app_webview(self._webview_data, start_param=ref_id)
+
                 if 'tgWebAppStartParam=' not in url:
                     separator = '?' if '#' in url else '&#'
                     insert_pos = url.find('#') if '#' in url else len(url)
@@ -236,170 +217,98 @@ class UniversalTelegramClient:
 
                 return url
 
-            except (Unauthorized, AuthKeyUnregistered):
+            except self.backend.flood_errors as fl:
+                raise FloodWaitDeferred(self.backend.flood_seconds(fl))
+            except self.backend.peer_invalid_errors:
+                self._webview_data = None
+                await self._invalidate_peer(bot_username)
+                raise
+            except self.backend.unauthorized_errors:
                 raise InvalidSession(f"{self.session_name}: User is unauthorized")
-            except (UserDeactivated, UserDeactivatedBan, PhoneNumberBanned):
+            except self.backend.banned_errors:
                 raise InvalidSession(f"{self.session_name}: User is banned")
 
-            except Exception:
-                raise
-
             finally:
-                if self.client.is_connected:
-                    await self.client.disconnect()
-                    await asyncio.sleep(15)
+                await self._end_batch()
 
-    async def _pyrogram_get_webview_url(self, bot_username: str, bot_url: str, default_val: str) -> str:
-        if self.proxy and not self.client.proxy:
-            logger.critical(f"<ly>{self.session_name}</ly> | Proxy found, but not passed to Client")
-            exit(-1)
+    async def _get_webview_url(self, bot_username: str, bot_url: str, default_val: str) -> str:
+        self._check_proxy_passed()
 
         async with self.lock:
+            await self.backend.begin_batch()
             try:
-                if not self.client.is_connected:
-                    await self.client.connect()
-                await self._pyrogram_initialize_webview_data(bot_username)
-                await asyncio.sleep(uniform(1, 2))
+                await self._initialize_webview_data(bot_username)
+                await self._sleep(uniform(1, 2))
 
                 start = {'start_param': self.get_ref_id()} if self.is_first_run else {}
 
-                start_state = False
-                async for message in self.client.get_chat_history(bot_username):
-                    if r'/start' in message.text:
-                        start_state = True
-                        break
-                await asyncio.sleep(uniform(0.5, 1))
+                start_state = await self.backend.has_start_message(bot_username)
+                await self._sleep(uniform(0.5, 1))
                 if not start_state:
-                    await self.client.invoke(pmessages.StartBot(**self._webview_data,
-                                                                random_id=randint(1, 2**63),
-                                                                **start))
-                await asyncio.sleep(uniform(1, 2))
-                web_view = await self.client.invoke(pmessages.RequestWebView(
-                    **self._webview_data,
-                    platform='android',
-                    from_bot_menu=False,
-                    url=bot_url,
-                    **start
-                ))
-
-                return web_view.url
-
-            except (Unauthorized, AuthKeyUnregistered):
-                raise InvalidSession(f"{self.session_name}: User is unauthorized")
-            except (UserDeactivated, UserDeactivatedBan, PhoneNumberBanned):
-                raise InvalidSession(f"{self.session_name}: User is banned")
+                    await self.backend.start_bot(self._webview_data, start)
+                await self._sleep(uniform(1, 2))
+
+                return await self.backend.request_webview(self._webview_data, bot_url, start)
 
-            except Exception:
+            except self.backend.flood_errors as fl:
+                raise FloodWaitDeferred(self.backend.flood_seconds(fl))
+            except self.backend.peer_invalid_errors:
+                self._webview_data = None
+                await self._invalidate_peer(bot_username)
                 raise
+            except self.backend.unauthorized_errors:
+                raise InvalidSession(f"{self.session_name}: User is unauthorized")
+            except self.backend.banned_errors:
+                raise InvalidSession(f"{self.session_name}: User is banned")
 
             finally:
-                if self.client.is_connected:
-                    await self.client.disconnect()
-                    await asyncio.sleep(15)
+                await self._end_batch()
 
-    async def _telethon_join_and_mute_tg_channel(self, link: str):
+    async def _join_and_mute_tg_channel(self, link: str) -> JoinResult:
         path = link.replace("https://t.me/", "")
         if path == 'money':
-            return
+            return JoinResult.SKIPPED
 
         async with self.lock:
-            async with self.client as client:
-                try:
-                    if path.startswith('+'):
-                        invite_hash = path[1:]
-                        result = await client(messages.ImportChatInviteRequest(hash=invite_hash))
-                        channel_title = result.chats[0].title
-                        entity = result.chats[0]
-                    else:
-                        entity = await client.get_entity(f'@{path}')
-                        await client(channels.JoinChannelRequest(channel=entity))
-                        channel_title = entity.title
-
-                    await asyncio.sleep(1)
-
-                    await client(account.UpdateNotifySettingsRequest(
-                        peer=InputNotifyPeer(entity),
-                        settings=InputPeerNotifySettings(
-                            show_previews=False,
-                            silent=True,
-                            mute_until=datetime.today() + timedelta(days=365)
-                        )
-                    ))
-
-                    logger.info(f"<ly>{self.session_name}</ly> | Subscribed to channel: <y>{channel_title}</y>")
-                except FloodWaitError as fl:
-                    logger.warning(f"<ly>{self.session_name}</ly> | FloodWait {fl}. Waiting {fl.seconds}s")
-                    return fl.seconds
-                except Exception as e:
-                    log_error(
-                        f"<ly>{self.session_name}</ly> | (Task) Error while subscribing to tg channel {link}: {e}")
-
-            await asyncio.sleep(uniform(15, 20))
-        return
-
-    async def _pyrogram_join_and_mute_tg_channel(self, link: str):
-        path = link.replace("https://t.me/", "")
-        if path == 'money':
-            return
-
-        async with self.lock:
-            async with self.client:
-                try:
-                    if path.startswith('+'):
-                        invite_hash = path[1:]
-                        result = await self.client.invoke(pmessages.ImportChatInvite(hash=invite_hash))
-                        channel_title = result.chats[0].title
-                        entity = result.chats[0]
-                        peer = ptypes.InputPeerChannel(channel_id=entity.id, access_hash=entity.access_hash)
-                    else:
-                        peer = await self.client.resolve_peer(f'@{path}')
-                        channel = ptypes.InputChannel(channel_id=peer.channel_id, access_hash=peer.access_hash)
-                        await self.client.invoke(pchannels.JoinChannel(channel=channel))
-                        channel_title = path
-
-                    await asyncio.sleep(1)
-
-                    await self.client.invoke(paccount.UpdateNotifySettings(
-                        peer=ptypes.InputNotifyPeer(peer=peer),
-                        settings=ptypes.InputPeerNotifySettings(
-                            show_previews=False,
-                            silent=True,
-                            mute_until=2147483647))
-                    )
-
-                    logger.info(f"<ly>{self.session_name}</ly> | Subscribed to channel: <y>{channel_title}</y>")
-                except FloodWait as e:
-                    logger.warning(f"<ly>{self.session_name}</ly> | FloodWait {e}. Waiting {e.value}s")
-                    return e.value
-                except UserAlreadyParticipant:
-                    logger.info(f"<ly>{self.session_name}</ly> | Was already Subscribed to channel: <y>{link}</y>")
-                except Exception as e:
-                    log_error(
-                        f"<ly>{self.session_name}</ly> | (Task) Error while subscribing to tg channel {link}: {e}")
-
-            await asyncio.sleep(uniform(15, 20))
-        return
-
-    async def _telethon_update_profile(self, first_name: str = None, last_name: str = None, about: str = None):
-        update_params = {
-            'first_name': first_name,
-            'last_name': last_name,
-            'about': about
-        }
-        update_params = {k: v for k, v in update_params.items() if v is not None}
-        if not update_params:
-            return
+            await self.backend.begin_batch()
+            try:
+                membership = None
+                if path.startswith('+'):
+                    peer, channel_title = await self.backend.import_chat_invite(path[1:])
+                else:
+                    membership = await self._get_membership(path)
+                    peer = await self._resolve_peer(path)
+                    if not membership:
+                        await self.backend.join_channel(peer)
+                    channel_title = path
+
+                if not membership or not membership['muted']:
+                    await self._sleep(1)
+                    await self.backend.mute_peer(peer)
+
+                if not path.startswith('+'):
+                    membership_cache.set(self.session_name, path, joined=True, muted=True)
+                logger.info(f"<ly>{self.session_name}</ly> | Subscribed to channel: <y>{channel_title}</y>")
+                return JoinResult.ALREADY_JOINED if membership and membership['muted'] else JoinResult.JOINED
+            except self.backend.flood_errors as fl:
+                seconds = self.backend.flood_seconds(fl)
+                logger.warning(f"<ly>{self.session_name}</ly> | FloodWait {fl}. Waiting {seconds}s")
+                raise FloodWaitDeferred(seconds)
+            except self.backend.already_participant_errors:
+                logger.info(f"<ly>{self.session_name}</ly> | Was already Subscribed to channel: <y>{link}</y>")
+                return JoinResult.ALREADY_JOINED
+            except self.backend.peer_invalid_errors as e:
+                await self._invalidate_peer(path)
+                log_error(f"<ly>{self.session_name}</ly> | Cached peer for {link} is no longer valid: {e}")
+                return JoinResult.FAILED
+            except Exception as e:
+                log_error(
+                    f"<ly>{self.session_name}</ly> | (Task) Error while subscribing to tg channel {link}: {e}")
+                return JoinResult.FAILED
+            finally:
+                await self._end_batch()
 
-        async with self.lock:
-            async with self.client:
-                try:
-                    await self.client(account.UpdateProfileRequest(**update_params))
-                except Exception as e:
-                    log_error(
-                        f"<ly>{self.session_name}</ly> | Failed to update profile: {e}")
-            await asyncio.sleep(uniform(15, 20))
-
-    async def _pyrogram_update_profile(self, first_name: str = None, last_name: str = None, about: str = None):
+    async def _update_profile(self, first_name: str = None, last_name: str = None, about: str = None):
         update_params = {
             'first_name': first_name,
             'last_name': last_name,
@@ -410,134 +319,78 @@ class UniversalTelegramClient:
             return
 
         async with self.lock:
-            async with self.client:
-                try:
-                    await self.client.invoke(paccount.UpdateProfile(**update_params))
-                except Exception as e:
-                    log_error(
-                        f"<ly>{self.session_name}</ly> | Failed to update profile: {e}")
-            await asyncio.sleep(uniform(15, 20))
+            await self.backend.begin_batch()
+            try:
+                await self.backend.update_profile(**update_params)
+            except self.backend.flood_errors as fl:
+                raise FloodWaitDeferred(self.backend.flood_seconds(fl))
+            except Exception as e:
+                log_error(
+                    f"<ly>{self.session_name}</ly> | Failed to update profile: {e}")
+            finally:
+                await self._end_batch()
 
     def get_ref_id(self) -> str:
         return self.ref_id
 
     async def join_telegram_channel(self, channel_data: dict) -> bool:
         """Универсальный метод для подписки на Telegram-каналы.
-        
+
         Args:
             channel_data: Словарь с данными канала, содержащий username
-            
+
         Returns:
             bool: True если подписка успешна, False в противном случае
         """
-        if not settings.SUBSCRIBE_TELEGRAM:
-            logger.warning(f"{self.session_name} | Channel subscriptions are disabled in settings")
-            return False
-            
         channel_username = channel_data.get("additional_data", {}).get("username", "")
         if not channel_username:
             logger.error(f"{self.session_name} | No channel username in task data")
             return False
-            
+
         channel_username = channel_username.replace("@", "")
-        
-        was_connected = self.client.is_connected if not self.is_pyrogram else self.client.is_connected
-        
+        try:
+            return await rpc_scheduler.run(self.session_name, 'join_channel',
+                                           lambda: self._join_telegram_channel(channel_username),
+                                           max_wait=MAX_QUEUED_FLOOD_WAIT)
+        except FloodWaitDeferred as e:
+            logger.warning(f"{self.session_name} | Subscription to <y>{channel_username}</y> postponed, "
+                           f"FloodWait {e.seconds}s")
+            return False
+
+    async def _join_telegram_channel(self, channel_username: str) -> bool:
+        await self.backend.begin_batch()
         try:
             logger.info(f"{self.session_name} | Subscribing to channel <y>{channel_username}</y>")
-            
-            if not was_connected:
-                await self.client.connect()
-                
+            peer = await self._resolve_peer(channel_username)
             try:
-                if self.is_pyrogram:
-                    try:
-                        await self.client.join_chat(channel_username)
-                        chat = await self.client.get_chat(channel_username)
-                        await self._pyrogram_mute_and_archive_channel(chat.id)
-                    except UserAlreadyParticipant:
-                        logger.info(f"{self.session_name} | Already subscribed to channel <y>{channel_username}</y>")
-                    return True
-                else:
-                    try:
-                        await self.client.join_chat(channel_username)
-                        chat = await self.client.get_chat(channel_username)
-                        await self._telethon_mute_and_archive_channel(chat.id)
-                    except UserAlreadyParticipant:
-                        logger.info(f"{self.session_name} | Already subscribed to channel <y>{channel_username}</y>")
-                    return True
-                    
-            except FloodWait as e:
-                wait_time = e.value if self.is_pyrogram else e.seconds
-                logger.warning(f"{self.session_name} | FloodWait for {wait_time} seconds")
-                await asyncio.sleep(wait_time)
-                return await self.join_telegram_channel(channel_data)
-                
-            except (UserBannedInChannel, UsernameNotOccupied, UsernameInvalid) as e:
-                logger.error(f"{self.session_name} | Error while subscribing: {str(e)}")
-                return False
-                
-            except Exception as e:
-                logger.error(f"{self.session_name} | Unknown error while subscribing: {str(e)}")
-                return False
-                
-        finally:
-            if not was_connected and (self.client.is_connected if not self.is_pyrogram else self.client.is_connected):
-                await self.client.disconnect()
-                
-        return False
+                await self.backend.join_channel(peer)
+            except self.backend.already_participant_errors:
+                logger.info(f"{self.session_name} | Already subscribed to channel <y>{channel_username}</y>")
+            await self._mute_and_archive_channel(peer)
+            return True
+
+        except self.backend.flood_errors as e:
+            wait_time = self.backend.flood_seconds(e)
+            logger.warning(f"{self.session_name} | FloodWait for {wait_time} seconds")
+            raise FloodWaitDeferred(wait_time)
 
-    async def _telethon_mute_and_archive_channel(self, channel_id: int) -> None:
-        try:
-            await self.client(account.UpdateNotifySettingsRequest(
-                peer=InputNotifyPeer(
-                    peer=await self.client.get_input_entity(channel_id)
-                ),
-                settings=InputPeerNotifySettings(
-                    mute_until=2147483647
-                )
-            ))
-            logger.info(f"{self.session_name} | Notifications disabled")
-            
-            await self.client(folders.EditPeerFolders(
-                folder_peers=[
-                    raw.InputFolderPeer(
-                        peer=await self.client.get_input_entity(channel_id),
-                        folder_id=1
-                    )
-                ]
-            ))
-            logger.info(f"{self.session_name} | Channel added to archive")
-            
         except Exception as e:
-            logger.warning(f"{self.session_name} | Error while configuring channel: {str(e)}")
+            logger.error(f"{self.session_name} | Error while subscribing: {str(e)}")
+            return False
+
+        finally:
+            await self.backend.end_batch()
 
-    async def _pyrogram_mute_and_archive_channel(self, channel_id: int) -> None:
+    async def _mute_and_archive_channel(self, peer) -> None:
         try:
-            peer = await self.client.resolve_peer(channel_id)
-            
-            await self.client.invoke(paccount.UpdateNotifySettings(
-                peer=ptypes.InputNotifyPeer(peer=peer),
-                settings=ptypes.InputPeerNotifySettings(
-                    mute_until=2147483647
-                )
-            ))
+            await self.backend.mute_peer(peer)
             logger.info(f"{self.session_name} | Notifications disabled")
-            
+
             try:
-                await self.client.invoke(
-                    pfolders.EditPeerFolders(
-                        folder_peers=[
-                            ptypes.InputFolderPeer(
-                                peer=peer,
-                                folder_id=1
-                            )
-                        ]
-                    )
-                )
+                await self.backend.archive_peer(peer)
                 logger.info(f"{self.session_name} | Channel added to archive")
             except Exception as e:
                 logger.warning(f"{self.session_name} | Error while archiving: {str(e)}")
-                
+
         except Exception as e:
             logger.warning(f"{self.session_name} | Error while configuring channel: {str(e)}")
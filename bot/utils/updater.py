@@ -80,6 +80,10 @@ class UpdateManager:
             return True
 
     async def check_for_updates(self) -> bool:
+        # git fetch can take up to a minute, so it runs off the event loop
+        return await asyncio.to_thread(self._fetch_and_check)
+
+    def _fetch_and_check(self) -> bool:
         try:
             subprocess.run(["git", "fetch"], check=True, capture_output=True, timeout=60)
             result = subprocess.run(
@@ -137,11 +141,11 @@ class UpdateManager:
     async def update_and_restart(self) -> None:
         logger.info("🔄 Update detected! Starting update process...")
         
-        if not self._pull_updates():
+        if not await asyncio.to_thread(self._pull_updates):
             logger.error("❌ Failed to pull updates")
             return
 
-        if not self._install_dependencies():
+        if not await asyncio.to_thread(self._install_dependencies):
             logger.error("❌ Failed to update dependencies")
             return
 
@@ -0,0 +1,130 @@
+"""Event-loop watchdog: loop lag, stalls, task counts per stage and executor queue depth.
+
+A heartbeat task measures how late the loop wakes it up. A daemon thread watches the
+heartbeat: when it stops for longer than WATCHDOG_LAG_THRESHOLD the loop is blocked, and
+the thread logs the callback holding it together with the loop thread's stack. Every
+WATCHDOG_REPORT_INTERVAL the running tasks are counted by the bot coroutine they are
+currently in and the executors' queues are measured. The values go to the event log as
+`watchdog` events and to /metrics in Prometheus text format on the PROFILER_PORT endpoint.
+"""
+import asyncio
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, sleep
+from typing import Optional
+
+from bot.config import settings
+from bot.utils import logger
+from bot.utils.event_log import emit_event
+from bot.utils.profiler import describe_callback, frame_name, thread_frames
+
+HEARTBEAT_INTERVAL = 0.25
+STACK_DEPTH = 12
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def task_stage(task: asyncio.Task) -> str:
+    """Innermost coroutine of the task that belongs to the bot, e.g. `TapperBot._sleep`."""
+    coro = task.get_coro()
+    stage = getattr(getattr(coro, 'cr_code', None), 'co_qualname', type(coro).__name__)
+    while coro is not None and hasattr(coro, 'cr_code'):
+        if coro.cr_code.co_filename.startswith(BOT_DIR):
+            stage = coro.cr_code.co_qualname
+        coro = coro.cr_await
+    return stage
+
+
+class LoopWatchdog:
+    def __init__(self):
+        self.executors: dict[str, ThreadPoolExecutor] = {}
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.task_counts: Counter = Counter()
+        self.queue_depths: dict[str, int] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = monotonic()
+        self._stalled_since: Optional[float] = None
+        self._running = False
+
+    def watch_executor(self, name: str, executor: ThreadPoolExecutor) -> None:
+        self.executors[name] = executor
+
+    def _queue_depths(self) -> dict[str, int]:
+        executors = dict(self.executors)
+        # asyncio.to_thread and run_in_executor(None, ...) use the loop's default executor
+        default_executor = getattr(self._loop, '_default_executor', None)
+        if default_executor is not None:
+            executors['default'] = default_executor
+        return {name: executor._work_queue.qsize() for name, executor in executors.items()}
+
+    def _watch(self) -> None:
+        threshold = settings.WATCHDOG_LAG_THRESHOLD
+        while self._running:
+            sleep(HEARTBEAT_INTERVAL)
+            blocked_for = monotonic() - self._last_beat
+            if blocked_for < threshold or self._stalled_since is not None or not self._running:
+                continue
+            self._stalled_since = self._last_beat
+            frames = thread_frames(self._loop_thread_id)
+            stack = '\n'.join(f"    {frame_name(frame, True)}" for frame in frames[-STACK_DEPTH:])
+            # Frame names such as <module> would be parsed as colour markup
+            logger.opt(colors=False).warning(f"Watchdog | Event loop blocked for {blocked_for:.2f}s by "
+                                             f"{describe_callback(frames) or 'the loop itself'}\n{stack}")
+
+    def _beat(self, lag: float) -> None:
+        self.lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        if self._stalled_since is not None:
+            self.stalls += 1
+            logger.warning(f"Watchdog | Event loop resumed after {monotonic() - self._stalled_since:.2f}s")
+            self._stalled_since = None
+
+    def report(self) -> None:
+        self.task_counts = Counter(task_stage(task) for task in asyncio.all_tasks(self._loop))
+        self.queue_depths = self._queue_depths()
+        for name, depth in self.queue_depths.items():
+            if depth >= settings.WATCHDOG_QUEUE_THRESHOLD:
+                logger.warning(f"Watchdog | {depth} jobs queued in the {name} executor")
+        emit_event('farm', 'watchdog', 'ok', latency=self.max_lag, tasks=sum(self.task_counts.values()),
+                   stalls=self.stalls, queues=self.queue_depths, stages=dict(self.task_counts.most_common(10)))
+        self.max_lag = 0.0
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = monotonic()
+        self._running = True
+        threading.Thread(target=self._watch, name='loop-watchdog', daemon=True).start()
+        next_report = monotonic() + settings.WATCHDOG_REPORT_INTERVAL
+        try:
+            while True:
+                expected = monotonic() + HEARTBEAT_INTERVAL
+                await asyncio.sleep(HEARTBEAT_INTERVAL)
+                self._last_beat = now = monotonic()
+                self._beat(max(now - expected, 0.0))
+                if now >= next_report:
+                    self.report()
+                    next_report = now + settings.WATCHDOG_REPORT_INTERVAL
+        finally:
+            self._running = False
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# TYPE giftopia_loop_lag_seconds gauge",
+            f"giftopia_loop_lag_seconds {self.lag:.6f}",
+            "# TYPE giftopia_loop_stalls_total counter",
+            f"giftopia_loop_stalls_total {self.stalls}",
+            "# TYPE giftopia_tasks gauge",
+        ]
+        lines += [f'giftopia_tasks{{stage="{stage}"}} {count}' for stage, count in sorted(self.task_counts.items())]
+        lines.append("# TYPE giftopia_executor_queue_depth gauge")
+        lines += [f'giftopia_executor_queue_depth{{executor="{name}"}} {depth}'
+                  for name, depth in sorted(self.queue_depths.items())]
+        return '\n'.join(lines) + '\n'
+
+
+watchdog = LoopWatchdog()
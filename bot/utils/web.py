@@ -1,30 +1,70 @@
-import os, subprocess, platform, signal, asyncio, stat
-from flask import Flask, request, jsonify, send_from_directory, render_template_string
-from werkzeug.utils import secure_filename
+import os, subprocess, platform, signal, asyncio, stat, sys, shutil, tarfile, tempfile, threading, zipfile
+from flask import Flask, Request, request, jsonify, send_from_directory, render_template_string
+
+from bot.utils.session_preflight import session_index, validate_session_file
 
 PROJECT_ROOT = os.path.abspath(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 UPLOAD_FOLDER = os.path.join(PROJECT_ROOT, "sessions")
-ALLOWED_EXTENSIONS = set(['session'])
-MAX_CONTENT_LENGTH = 100 * 1024 * 1024 
+UPLOAD_TMP_FOLDER = os.path.join(UPLOAD_FOLDER, ".uploads")
+SESSION_EXTENSION = '.session'
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+MAX_CONTENT_LENGTH = 1024 * 1024 * 1024
+MAX_SESSION_SIZE = 50 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+WEB_PORT = 7777
+WEB_THREADS = 8
+WEB_LOG_PATH = "logs/web.log"
+
+os.makedirs(UPLOAD_TMP_FOLDER, exist_ok=True)
+
+
+class UploadRequest(Request):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tmp_files = []
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Multipart file parts are written chunk by chunk into the upload folder, never kept in memory
+        return self.create_tmp_file()
+
+    def create_tmp_file(self):
+        tmp_file = tempfile.NamedTemporaryFile('wb+', dir=UPLOAD_TMP_FOLDER, delete=False)
+        self.tmp_files.append(tmp_file)
+        return tmp_file
+
+    def remove_tmp_files(self):
+        """Deletes the temporary files of this request that were not moved into the sessions folder."""
+        for tmp_file in self.tmp_files:
+            tmp_file.close()
+            try:
+                os.remove(tmp_file.name)
+            except FileNotFoundError:
+                pass
 
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 app = Flask(__name__)
+app.request_class = UploadRequest
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 
 flask_process = None
 tunnel_process = None
+index_lock = threading.Lock()
+
+def is_archive(filename):
+    return filename.lower().endswith(ARCHIVE_EXTENSIONS)
 
 def allowed_file(filename):
-    if '.' not in filename:
-        return False
-    ext = filename.rsplit('.', 1)[1].lower()
-    return ext in ALLOWED_EXTENSIONS
+    return filename.lower().endswith(SESSION_EXTENSION) or is_archive(filename)
 
 @app.errorhandler(413)
 def request_entity_too_large(error):
-    return jsonify({'error': 'File is too large. Maximum size: 100MB'}), 413
+    return jsonify({'error': 'File is too large. Maximum size: 1GB'}), 413
+
+@app.teardown_request
+def remove_upload_tmp_files(error=None):
+    # Also runs when parsing the multipart body or storing an upload failed halfway
+    request.remove_tmp_files()
 
 @app.after_request
 def add_header(response):
@@ -59,7 +99,7 @@ def index():
           <h1 class="text-3xl font-semibold text-center text-gray-800 mb-6">Session Manager by @mffff4</h1>
           <div class="mb-6">
             <form action="/upload" class="dropzone" id="upload-dropzone">
-              <div class="dz-message">Drag & drop files here or click to upload<br/><span class="text-sm text-gray-500">(Max file size: 100MB)</span></div>
+              <div class="dz-message">Drag & drop .session files or zip/tar archives here or click to upload<br/><span class="text-sm text-gray-500">(Max file size: 1GB)</span></div>
             </form>
             <div id="upload-status" class="mt-4"></div>
           </div>
@@ -85,8 +125,10 @@ def index():
           Dropzone.autoDiscover = false;
           const uploadDropzone = new Dropzone("#upload-dropzone", { 
             paramName: "file", 
-            maxFilesize: 100, 
-            acceptedFiles: ".session", 
+            maxFilesize: 1024, 
+            acceptedFiles: ".session,.zip,.tar,.gz,.tgz,.bz2,.xz", 
+            parallelUploads: 4,
+            timeout: 0,
             addRemoveLinks: false,
             dictDefaultMessage: "Drag & drop files here or click to upload",
             init: function() {
@@ -200,37 +242,96 @@ def index():
     </html>
     ''')
 
+def save_index(entries):
+    if not entries:
+        return
+    with index_lock:
+        # Re-read first: the bot may have updated the index since this process loaded it
+        session_index.reload()
+        session_index.data.update(entries)
+        session_index.save_sync(*entries)
+
+def place_session(filename, tmp_path, uploaded, rejected, index_entries):
+    """Validates a landed session file and moves it into the sessions folder, recording the outcome."""
+    entry = validate_session_file(tmp_path, os.stat(tmp_path), None)
+    if entry['error']:
+        os.remove(tmp_path)
+        rejected[filename] = entry['error']
+        return
+    os.replace(tmp_path, os.path.join(UPLOAD_FOLDER, filename))
+    index_entries[filename[:-len(SESSION_EXTENSION)]] = entry
+    uploaded.append(filename)
+
+def copy_member(source, uploaded, rejected, index_entries, filename):
+    with request.create_tmp_file() as target:
+        shutil.copyfileobj(source, target, CHUNK_SIZE)
+    place_session(filename, target.name, uploaded, rejected, index_entries)
+
+def unpack_archive(archive_path, archive_name, uploaded, rejected, index_entries):
+    """Extracts the .session members of a zip or tar archive one at a time, validating each as it lands."""
+    if archive_name.lower().endswith('.zip'):
+        with zipfile.ZipFile(archive_path) as archive:
+            for member in archive.infolist():
+                filename = os.path.basename(member.filename)
+                if member.is_dir() or not filename.endswith(SESSION_EXTENSION):
+                    continue
+                if member.file_size > MAX_SESSION_SIZE:
+                    rejected[filename] = 'file is too large'
+                    continue
+                with archive.open(member) as source:
+                    copy_member(source, uploaded, rejected, index_entries, filename)
+    else:
+        with tarfile.open(archive_path, 'r:*') as archive:
+            for member in archive:
+                filename = os.path.basename(member.name)
+                if not member.isfile() or not filename.endswith(SESSION_EXTENSION):
+                    continue
+                if member.size > MAX_SESSION_SIZE:
+                    rejected[filename] = 'file is too large'
+                    continue
+                with archive.extractfile(member) as source:
+                    copy_member(source, uploaded, rejected, index_entries, filename)
+
+def store_upload(file, uploaded, rejected, index_entries):
+    filename = os.path.basename(file.filename.replace('\\', '/'))
+    tmp_path = getattr(file.stream, 'name', None)
+    try:
+        if not filename or not allowed_file(filename):
+            rejected[filename or file.filename] = 'file type not allowed'
+        elif not isinstance(tmp_path, str):
+            rejected[filename] = 'upload was not written to disk'
+        elif is_archive(filename):
+            file.stream.close()
+            unpack_archive(tmp_path, filename, uploaded, rejected, index_entries)
+        else:
+            file.stream.close()
+            place_session(filename, tmp_path, uploaded, rejected, index_entries)
+    except (OSError, zipfile.BadZipFile, tarfile.TarError) as e:
+        rejected[filename] = f'failed to unpack or save: {e}'
+    finally:
+        file.stream.close()
+        if isinstance(tmp_path, str) and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
-    print("Received file upload request")
-    if 'file' not in request.files:
+    files = [file for file in request.files.getlist('file') if file.filename]
+    if not files:
         error_msg = 'No file in the request'
         print(f"Error: {error_msg}")
         return jsonify({'error': error_msg}), 400
-    file = request.files['file']
-    print(f"Uploaded file name: {file.filename}")
-    if file.filename == '':
-        error_msg = 'No file selected'
-        print(f"Error: {error_msg}")
-        return jsonify({'error': error_msg}), 400
-    if file and allowed_file(file.filename):
-        filename = file.filename
-        print(f"Processed file name: {filename}")
-        save_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        print(f"File save path: {save_path}")
-        try:
-            file.save(save_path)
-            success_msg = f"File '{filename}' successfully uploaded"
-            print(success_msg)
-            return jsonify({'success': success_msg}), 200
-        except Exception as e:
-            error_msg = f"Failed to save file: {str(e)}"
-            print(f"Error: {error_msg}")
-            return jsonify({'error': error_msg}), 500
-    else:
-        error_msg = 'File type not allowed'
-        print(f"Error: {error_msg}")
-        return jsonify({'error': error_msg}), 400
+    uploaded, rejected, index_entries = [], {}, {}
+    for file in files:
+        store_upload(file, uploaded, rejected, index_entries)
+    save_index(index_entries)
+    for filename, reason in rejected.items():
+        print(f"Error: '{filename}' rejected: {reason}")
+    if not uploaded:
+        error_msg = '; '.join(f"'{filename}': {reason}" for filename, reason in rejected.items())
+        return jsonify({'error': f"No sessions uploaded. {error_msg}", 'rejected': rejected}), 400
+    success_msg = f"{len(uploaded)} session(s) uploaded" + (f", {len(rejected)} rejected" if rejected else "")
+    print(success_msg)
+    return jsonify({'success': success_msg, 'uploaded': uploaded, 'rejected': rejected}), 200
 
 def get_file_name_without_extension(filename):
     return os.path.splitext(filename)[0]
@@ -325,14 +426,15 @@ async def run_web_and_tunnel():
     
     clear_screen()
     
-    os.environ["FLASK_APP"] = "bot/utils/web.py"
-    flask_process = subprocess.Popen(
-        ["flask", "run", "--host", "0.0.0.0", "--port", "7777"],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE
-    )
+    os.makedirs(os.path.dirname(WEB_LOG_PATH), exist_ok=True)
+    with open(WEB_LOG_PATH, 'a') as web_log:
+        flask_process = subprocess.Popen(
+            [sys.executable, "-u", "-m", "bot.utils.web"],
+            stdout=web_log,
+            stderr=subprocess.STDOUT
+        )
     tunnel_process = subprocess.Popen(
-        ["ssh", "-o", "StrictHostKeyChecking=no", "-R", "80:localhost:7777", "serveo.net"],
+        ["ssh", "-o", "StrictHostKeyChecking=no", "-R", f"80:localhost:{WEB_PORT}", "serveo.net"],
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE
     )
@@ -344,6 +446,9 @@ async def run_web_and_tunnel():
             print("Press Ctrl+C to exit.")
             break
     while True:
+        if flask_process.poll() is not None:
+            print(f"Web server exited with code {flask_process.returncode}, see {WEB_LOG_PATH}")
+            break
         await asyncio.sleep(1)
 
 async def stop_web_and_tunnel():
@@ -357,7 +462,9 @@ async def stop_web_and_tunnel():
     print("Web server and tunnel stopped.")
 
 if __name__ == '__main__':
+    from waitress import serve
+
     print(f"UPLOAD_FOLDER path: {UPLOAD_FOLDER}")
     print(f"UPLOAD_FOLDER absolute path: {os.path.abspath(UPLOAD_FOLDER)}")
     print(f"Current working directory: {os.getcwd()}")
-    app.run(host='0.0.0.0', port=7777)
+    serve(app, host='0.0.0.0', port=WEB_PORT, threads=WEB_THREADS, max_request_body_size=MAX_CONTENT_LENGTH)
@@ -1,9 +1,17 @@
 import asyncio
+import sys
 from contextlib import suppress
+from bot.devtools import startup_profile
+
+if '--profile-startup' in sys.argv:
+    startup_profile.enable()
+
 from bot.core.launcher import process
 from os import system, name as os_name, environ
 import os
 
+startup_profile.mark('launcher imported')
+
 def is_docker() -> bool:
     path = '/proc/self/cgroup'
     return os.path.exists('/.dockerenv') or (os.path.isfile(path) and any('docker' in line for line in open(path)))
@@ -0,0 +1,8 @@
+from bot.devtools.startup_budget import check
+
+
+def test_launcher_import_within_budget(monkeypatch):
+    # Only the import is measured; the settings just need to validate
+    monkeypatch.setenv('API_ID', '1')
+    monkeypatch.setenv('API_HASH', 'startup-budget')
+    assert check(budget_ms=800, runs=3) == []